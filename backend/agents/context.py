@@ -0,0 +1,170 @@
+import os
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+from backend.agents.utils import asummarize_conversation
+from backend.agents.llm_scheduler import Priority, llm_request
+from backend.database import AsyncSessionLocal
+from backend.database.chat_message import aget_chat_messages_after
+
+logger = logging.getLogger(__name__)
+
+# How much conversation a juror sees
+CONTEXT_RECENT_MESSAGES = int(os.getenv("CONTEXT_RECENT_MESSAGES", "10"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# Number of recent renders kept so a re-judged message sees the same context
+CONTEXT_RENDER_HISTORY = 16
+# Evicted messages are folded into the rolling summary in batches of this size
+CONTEXT_SUMMARY_BATCH = int(os.getenv("CONTEXT_SUMMARY_BATCH", "5"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+def format_message(msg) -> str:
+    return f"{msg.username}: {msg.message}"
+
+
+async def load_messages(discussion_id: int, after_id: int, upto_id: int):
+    """Messages after_id < id <= upto_id, in a session that is closed again before returning."""
+    async with AsyncSessionLocal() as db:
+        return await aget_chat_messages_after(db, discussion_id, after_id, upto_id=upto_id)
+
+
+class DebateContext:
+    """Rolling summary of older turns plus the last few messages verbatim."""
+
+    def __init__(self, recent_limit: int = CONTEXT_RECENT_MESSAGES,
+                 token_budget: int = CONTEXT_TOKEN_BUDGET,
+                 summary_batch: int = CONTEXT_SUMMARY_BATCH):
+        self.recent_limit = recent_limit
+        self.token_budget = token_budget
+        self.summary_batch = summary_batch
+        self.summary = ""
+        self.recent: deque = deque()
+        self.pending: List[str] = []  # evicted from recent, not yet summarized
+        self.last_message_id = 0
+        # The last round's own messages; they join the context once a later round starts after them
+        self.staged: List[Tuple[int, str]] = []
+        # message_id -> conv_history it was judged with, for re-judging recent messages
+        self.renders: "OrderedDict[int, str]" = OrderedDict()
+
+    def add(self, message_id: int, line: str):
+        self.recent.append(line)
+        while len(self.recent) > self.recent_limit:
+            self.pending.append(self.recent.popleft())
+        self.last_message_id = max(self.last_message_id, message_id)
+
+    async def fold(self):
+        """Fold pending messages into the summary once a full batch has built up."""
+        if len(self.pending) < self.summary_batch:
+            return
+        try:
+            self.summary = await asummarize_conversation(self.summary, "\n".join(self.pending))
+            self.pending = []
+        except Exception as e:
+            # Keep the pending lines verbatim; render() trims them to the budget
+            logger.error(f"Error updating conversation summary: {str(e)}")
+
+    def remember_render(self, message_id: int, conv_history: str):
+        self.renders[message_id] = conv_history
+        while len(self.renders) > CONTEXT_RENDER_HISTORY:
+            self.renders.popitem(last=False)
+
+    def render(self) -> str:
+        lines = self.pending + list(self.recent)
+        summary = self.summary
+        header = "Summary of earlier discussion:\n" if summary else ""
+
+        used = estimate_tokens(header + summary)
+        if used > self.token_budget:
+            summary = summary[:self.token_budget * 4]
+            used = estimate_tokens(header + summary)
+
+        # Keep the newest lines that still fit in the budget
+        kept = []
+        for line in reversed(lines):
+            cost = estimate_tokens(line)
+            if used + cost > self.token_budget:
+                break
+            kept.append(line)
+            used += cost
+        kept.reverse()
+
+        conv_history = ""
+        if summary:
+            conv_history += f"{header}{summary}\n\n"
+        for line in kept:
+            conv_history += f"{line}\n"
+        return conv_history
+
+
+class ConversationContextStore:
+    """Per-debate conversation contexts, advanced incrementally as messages arrive."""
+
+    def __init__(self):
+        self._contexts: Dict[str, DebateContext] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _lock(self, discussion_id: str) -> asyncio.Lock:
+        if discussion_id not in self._locks:
+            self._locks[discussion_id] = asyncio.Lock()
+        return self._locks[discussion_id]
+
+    async def build(self, discussion_id: int, message_id: int, first_message_id: Optional[int] = None) -> Tuple[str, str]:
+        """Return (conv_history, new_message) for judging messages first_message_id..message_id.
+
+        Messages are read in a short session of their own, closed before the
+        summary LLM call. Only messages newer than the last one seen
+        are read from the database, so each message is loaded and folded into
+        the context exactly once. A round's own messages are only folded in
+        when a later round starts after them, so a cancelled round that is
+        re-run with more messages does not see them twice.
+        """
+        if first_message_id is None:
+            first_message_id = message_id
+        key = str(discussion_id)
+        async with self._lock(key):
+            ctx = self._contexts.get(key)
+            if ctx is None:
+                ctx = self._contexts[key] = DebateContext()
+
+            # A round that was cancelled and re-run with more messages takes its staged messages back
+            for msg_id, line in ctx.staged:
+                if msg_id < first_message_id:
+                    ctx.add(msg_id, line)
+            ctx.staged = []
+
+            new_lines = []
+            if first_message_id > ctx.last_message_id:
+                for msg in await load_messages(discussion_id, ctx.last_message_id, message_id):
+                    if msg.id >= first_message_id:
+                        new_lines.append((msg.id, format_message(msg)))
+                        continue
+                    ctx.add(msg.id, format_message(msg))
+                with llm_request(Priority.CONVERSATION_SUMMARY, discussion_id):
+                    await ctx.fold()
+                conv_history = ctx.render()
+                ctx.remember_render(message_id, conv_history)
+                ctx.staged = list(new_lines)
+            else:
+                # Re-judging older messages: reuse the context they were judged with if we still have it
+                for msg in await load_messages(discussion_id, first_message_id - 1, message_id):
+                    new_lines.append((msg.id, format_message(msg)))
+                conv_history = ctx.renders.get(message_id)
+                if conv_history is None:
+                    conv_history = ctx.render()
+
+            return conv_history, "\n".join(line for _, line in new_lines)
+
+    def forget(self, discussion_id):
+        key = str(discussion_id)
+        self._contexts.pop(key, None)
+        self._locks.pop(key, None)
+
+
+conversation_contexts = ConversationContextStore()
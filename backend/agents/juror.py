@@ -1,5 +1,7 @@
 import dspy
-from backend.data_structure import Side
+from dspy.streaming import StreamListener, StreamResponse
+from backend.data_structure import Side, JurorVerdict
+from backend.agents.registry import modules
 
 
 class Juror:
@@ -7,12 +9,81 @@ class Juror:
         self.persona = persona
 
     def judge(self, topic: str, sides: list[Side], conv_history: str, past_reasoning: str, previous_decision: int, new_message: str):
-        f = dspy.ChainOfThought(JurorDecision)
-        side_msg = ""
-        for side in sides:
-            side_msg += f"{side.id}: {side.description}\n"
+        f = modules.get("juror")
+        side_msg = format_sides(sides)
         response = f(persona=self.persona, topic=topic, sides=side_msg, conv_history=conv_history, past_reasoning=past_reasoning, previous_decision=previous_decision, new_message=new_message)
         return response.correct_side_id, response.reasoning
+
+    async def ajudge(self, topic: str, sides: list[Side], conv_history: str, past_reasoning: str, previous_decision: int, new_message: str, on_reasoning=None):
+        """Same as judge, but awaits the LM through dspy's async path so the event loop is not blocked.
+
+        If on_reasoning is given, it is awaited with each chunk of the reasoning as the LM streams it.
+        """
+        f = modules.get("juror")
+        side_msg = format_sides(sides)
+        inputs = dict(persona=self.persona, topic=topic, sides=side_msg, conv_history=conv_history, past_reasoning=past_reasoning, previous_decision=previous_decision, new_message=new_message)
+        if on_reasoning is None:
+            response = await f.acall(**inputs)
+            return response.correct_side_id, response.reasoning
+
+        # Stream listeners keep per-stream state, so the streaming wrapper is built per call
+        stream = dspy.streamify(
+            f,
+            stream_listeners=[StreamListener(signature_field_name="reasoning")],
+            is_async_program=True
+        )
+        response = None
+        async for value in stream(**inputs):
+            if isinstance(value, StreamResponse):
+                await on_reasoning(value.chunk)
+            elif isinstance(value, dspy.Prediction):
+                response = value
+        return response.correct_side_id, response.reasoning
+
+    async def ajudge_with_confidence(self, lm: dspy.LM, topic: str, sides: list[Side], conv_history: str, past_reasoning: str, previous_decision: int, new_message: str):
+        """Judge with the given (cheap) LM and also report how confident the juror is, from 0 to 1."""
+        f = modules.get("juror_confidence")
+        side_msg = format_sides(sides)
+        with dspy.context(lm=lm):
+            response = await f.acall(persona=self.persona, topic=topic, sides=side_msg, conv_history=conv_history, past_reasoning=past_reasoning, previous_decision=previous_decision, new_message=new_message)
+        return response.correct_side_id, response.reasoning, float(response.confidence)
+
+
+class Jury:
+    """All jurors of a debate, judged together in a single LLM call."""
+
+    def __init__(self, personas: dict[int, str]):
+        self.personas = personas
+
+    def format_jurors(self, past_decisions: dict[int, tuple[str, int]]) -> str:
+        juror_msg = ""
+        for juror_id, persona in self.personas.items():
+            past_reasoning, previous_decision = past_decisions.get(juror_id, ("", -1))
+            juror_msg += (
+                f"Juror {juror_id}\n"
+                f"Persona: {persona}\n"
+                f"Previous Decision: {previous_decision}\n"
+                f"Past Reasoning: {past_reasoning}\n\n"
+            )
+        return juror_msg
+
+    async def ajudge(self, topic: str, sides: list[Side], conv_history: str, past_decisions: dict[int, tuple[str, int]], new_message: str):
+        """Returns juror_id -> (correct_side_id, reasoning) for every juror the model answered for."""
+        f = modules.get("jury")
+        side_msg = format_sides(sides)
+        response = await f.acall(jurors=self.format_jurors(past_decisions), topic=topic, sides=side_msg, conv_history=conv_history, new_message=new_message)
+        results = {}
+        for verdict in response.decisions:
+            if verdict.juror_id in self.personas:
+                results[verdict.juror_id] = (verdict.correct_side_id, verdict.reasoning)
+        return results
+
+
+def format_sides(sides: list[Side]) -> str:
+    side_msg = ""
+    for side in sides:
+        side_msg += f"{side.id}: {side.description}\n"
+    return side_msg
     
 
 
@@ -44,3 +115,39 @@ class JurorDecision(dspy.Signature):
     new_message = dspy.InputField(prefix="New Message：")
     correct_side_id: int = dspy.OutputField(prefix="Choice：", description="choose the id of the side that is more correct")
 
+
+
+JurorDecisionWithConfidence = JurorDecision.append(
+    "confidence",
+    dspy.OutputField(prefix="Confidence：", description="how confident you are in your choice, from 0.0 to 1.0"),
+    type_=float
+)
+
+
+class JuryDecision(dspy.Signature):
+    """
+    You are simulating a panel of jurors in a debate. Each juror's persona, previous decision and past reasoning are given below.
+    Given a discussion about a topic, decide independently for every juror which side that juror thinks is more correct.
+    # Reasoning Guidelines:
+    1. Each juror's reasoning is written in the first person, from that juror's persona only.
+    2. Summarize each juror's concerns and reasoning in a concise manner, straight to the point.
+    3. Do not repeat the persona in the reasoning.
+    4. Each juror should consider their past reasoning and the new message when making their decision.
+    5. Repeat a juror's past reasoning if the new message is irrelevant to the debate.
+
+    # Output Guidelines:
+    1. A juror changes their decision only if the new message addresses their concerns or provides information that convinces them.
+    2. Output exactly one decision per juror, using the juror ids given.
+    """
+
+    jurors = dspy.InputField(prefix="Jurors：")
+    topic = dspy.InputField(prefix="Topic：")
+    sides = dspy.InputField(prefix="Sides：")
+    conv_history = dspy.InputField(prefix="Conversation History：")
+    new_message = dspy.InputField(prefix="New Message：")
+    decisions: list[JurorVerdict] = dspy.OutputField(prefix="Decisions：", description="one decision per juror with juror_id, correct_side_id and reasoning")
+
+
+modules.register("juror", lambda: dspy.ChainOfThought(JurorDecision))
+modules.register("jury", lambda: dspy.Predict(JuryDecision))
+modules.register("juror_confidence", lambda: dspy.ChainOfThought(JurorDecisionWithConfidence))
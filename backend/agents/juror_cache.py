@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+JUROR_CACHE_SIZE = int(os.getenv("JUROR_CACHE_SIZE", "1024"))
+JUROR_CACHE_TTL_SECONDS = float(os.getenv("JUROR_CACHE_TTL_SECONDS", "3600"))
+JUROR_CACHE_DIR = os.getenv("JUROR_CACHE_DIR")  # Optional on-disk tier, disabled when unset
+
+
+def make_cache_key(persona: str, topic: str, sides: str, conv_history: str, previous_decision, new_message: str) -> str:
+    """Content address of a juror decision: same inputs, same key."""
+    conv_hash = hashlib.sha256(conv_history.encode("utf-8")).hexdigest()
+    payload = json.dumps(
+        [persona, topic, sides, conv_hash, str(previous_decision), new_message],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class JurorDecisionCache:
+    """Two-tier (memory LRU + optional disk) TTL cache of (result, reasoning) pairs."""
+
+    def __init__(self, max_size: int = JUROR_CACHE_SIZE, ttl: float = JUROR_CACHE_TTL_SECONDS,
+                 cache_dir: Optional[str] = JUROR_CACHE_DIR):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self._memory: "OrderedDict[str, Tuple[float, Tuple[int, str]]]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _expired(self, stored_at: float) -> bool:
+        return time.time() - stored_at > self.ttl
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, Tuple[int, str]]]:
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Error reading juror cache entry {key}: {str(e)}")
+            return None
+        if self._expired(data["stored_at"]):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return data["stored_at"], (data["result"], data["reasoning"])
+
+    def _write_disk(self, key: str, stored_at: float, value: Tuple[int, str]):
+        if not self.cache_dir:
+            return
+        try:
+            tmp_path = self._disk_path(key) + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({"stored_at": stored_at, "result": value[0], "reasoning": value[1]}, f)
+            os.replace(tmp_path, self._disk_path(key))
+        except Exception as e:
+            logger.error(f"Error writing juror cache entry {key}: {str(e)}")
+
+    def _remember(self, key: str, stored_at: float, value: Tuple[int, str]):
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[Tuple[int, str]]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            if not self._expired(stored_at):
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._memory[key]
+
+        entry = self._read_disk(key)
+        if entry is not None:
+            stored_at, value = entry
+            self._remember(key, stored_at, value)
+            self.hits += 1
+            self.disk_hits += 1
+            return value
+
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: Tuple[int, str]):
+        stored_at = time.time()
+        self._remember(key, stored_at, value)
+        self._write_disk(key, stored_at, value)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._memory),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "disk_enabled": bool(self.cache_dir),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+juror_cache = JurorDecisionCache()
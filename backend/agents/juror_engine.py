@@ -0,0 +1,231 @@
+import os
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from backend.agents.juror import Juror, Jury, format_sides
+from backend.agents.juror_cache import JurorDecisionCache, juror_cache, make_cache_key
+from backend.agents.llm_scheduler import Priority, llm_request
+
+logger = logging.getLogger(__name__)
+
+# Concurrency limits for juror LLM calls
+JUROR_GLOBAL_CONCURRENCY = int(os.getenv("JUROR_GLOBAL_CONCURRENCY", "16"))
+JUROR_DEBATE_CONCURRENCY = int(os.getenv("JUROR_DEBATE_CONCURRENCY", "5"))
+JUROR_TIMEOUT_SECONDS = float(os.getenv("JUROR_TIMEOUT_SECONDS", "60"))
+# Stream each juror's reasoning to clients while the LM is still generating it
+JUROR_STREAM_REASONING = os.getenv("JUROR_STREAM_REASONING", "true").lower() in ("1", "true", "yes")
+# Cascade mode: the fast model's answer is kept only if it repeats the previous decision with at least this confidence
+CASCADE_CONFIDENCE_THRESHOLD = float(os.getenv("CASCADE_CONFIDENCE_THRESHOLD", "0.7"))
+
+
+class CascadeStats:
+    def __init__(self):
+        self.fast_calls = 0
+        self.accepted = 0
+        # Jurors without a previous decision go straight to the strong model
+        self.first_judgments = 0
+        self.escalations = {"flip": 0, "low_confidence": 0, "fast_error": 0}
+
+    def to_dict(self) -> dict:
+        escalated = sum(self.escalations.values())
+        return {
+            "fast_calls": self.fast_calls,
+            "accepted": self.accepted,
+            "escalated": escalated,
+            "escalations_by_reason": dict(self.escalations),
+            "escalation_rate": escalated / self.fast_calls if self.fast_calls else 0.0,
+            "first_judgments": self.first_judgments
+        }
+
+
+class JurorEngine:
+    """Runs juror judgments on the event loop with bounded concurrency.
+
+    Every juror call holds one slot of its debate's semaphore and one slot of
+    the process-wide semaphore, so a single busy debate cannot starve the
+    others and the LLM provider never sees more than `global_limit` requests
+    from this process at once. Decisions are looked up in the juror cache
+    first, so a repeated judgment never reaches the LLM.
+
+    In cascade mode a juror is first asked with `fast_lm`; the strong
+    (default) model is only called when the fast answer flips the previous
+    decision or its confidence is below `cascade_threshold`.
+    """
+
+    def __init__(self, global_limit: int = JUROR_GLOBAL_CONCURRENCY,
+                 debate_limit: int = JUROR_DEBATE_CONCURRENCY,
+                 timeout: float = JUROR_TIMEOUT_SECONDS,
+                 cache: Optional[JurorDecisionCache] = juror_cache,
+                 fast_lm=None, cascade_threshold: float = CASCADE_CONFIDENCE_THRESHOLD):
+        self.global_limit = global_limit
+        self.debate_limit = debate_limit
+        self.timeout = timeout
+        self.cache = cache
+        self.fast_lm = fast_lm
+        self.cascade_threshold = cascade_threshold
+        self.cascade_stats = CascadeStats()
+        self._global_semaphore = asyncio.Semaphore(global_limit)
+        self._debate_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _debate_semaphore(self, debate_id: str) -> asyncio.Semaphore:
+        if debate_id not in self._debate_semaphores:
+            self._debate_semaphores[debate_id] = asyncio.Semaphore(self.debate_limit)
+        return self._debate_semaphores[debate_id]
+
+    @staticmethod
+    def _cache_key(persona: str, previous_decision, kwargs: dict) -> str:
+        return make_cache_key(
+            persona=persona,
+            topic=kwargs["topic"],
+            sides=format_sides(kwargs["sides"]),
+            conv_history=kwargs["conv_history"],
+            previous_decision=previous_decision,
+            new_message=kwargs["new_message"]
+        )
+
+    def forget_debate(self, debate_id: str):
+        """Drop the per-debate semaphore once a debate has ended."""
+        self._debate_semaphores.pop(str(debate_id), None)
+
+    async def _judge_cascade(self, debate_id: str, juror: Juror, kwargs: dict) -> Tuple[int, str]:
+        if kwargs["previous_decision"] == -1:
+            # Nothing for the fast answer to confirm; it would always escalate as a flip
+            self.cascade_stats.first_judgments += 1
+            return await juror.ajudge(**kwargs)
+        fast_kwargs = {k: v for k, v in kwargs.items() if k != "on_reasoning"}
+        self.cascade_stats.fast_calls += 1
+        try:
+            result, reasoning, confidence = await juror.ajudge_with_confidence(self.fast_lm, **fast_kwargs)
+        except Exception as e:
+            logger.error(f"Fast juror model failed in debate {debate_id}: {str(e)}")
+            reason = "fast_error"
+        else:
+            if result == kwargs["previous_decision"] and confidence >= self.cascade_threshold:
+                self.cascade_stats.accepted += 1
+                return result, reasoning
+            reason = "flip" if result != kwargs["previous_decision"] else "low_confidence"
+        self.cascade_stats.escalations[reason] += 1
+        return await juror.ajudge(**kwargs)
+
+    async def judge(self, debate_id: str, juror: Juror, cascade: bool = False, **kwargs) -> Optional[Tuple[int, str]]:
+        """Run a single juror judgment, through the fast/strong model cascade if requested.
+
+        Returns:
+            (result, reasoning), or None if the juror timed out or failed.
+        """
+        key = None
+        if self.cache is not None:
+            key = self._cache_key(juror.persona, kwargs["previous_decision"], kwargs)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        async with self._debate_semaphore(str(debate_id)):
+            async with self._global_semaphore:
+                try:
+                    with llm_request(Priority.JUROR, debate_id):
+                        if cascade and self.fast_lm is not None:
+                            judgment = self._judge_cascade(debate_id, juror, kwargs)
+                        else:
+                            judgment = juror.ajudge(**kwargs)
+                        outcome = await asyncio.wait_for(judgment, timeout=self.timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(f"Juror timed out after {self.timeout}s in debate {debate_id}")
+                    return None
+                except Exception as e:
+                    logger.error(f"Juror failed in debate {debate_id}: {str(e)}")
+                    return None
+
+        if key is not None:
+            self.cache.set(key, outcome)
+        return outcome
+
+    async def judge_panel(self, debate_id: str, jury: Jury, on_done=None, **kwargs) -> Dict[Any, Tuple[int, str]]:
+        """Judge every juror of a debate with one LLM call (batched juror mode).
+
+        on_done(juror_id, result, reasoning) is awaited for every juror once the panel answers.
+
+        Returns:
+            juror_id -> (result, reasoning) for every juror the model answered for
+        """
+        results = {}
+        keys = {}
+        if self.cache is not None:
+            past_decisions = kwargs["past_decisions"]
+            for juror_id, persona in jury.personas.items():
+                previous_decision = past_decisions.get(juror_id, ("", -1))[1]
+                keys[juror_id] = self._cache_key(persona, previous_decision, kwargs)
+                cached = self.cache.get(keys[juror_id])
+                if cached is not None:
+                    results[juror_id] = cached
+            if len(results) == len(jury.personas):
+                await self._notify_done(on_done, results)
+                return results
+            # Only ask the model about the jurors that missed the cache
+            jury = Jury(personas={
+                juror_id: persona for juror_id, persona in jury.personas.items() if juror_id not in results
+            })
+
+        async with self._debate_semaphore(str(debate_id)):
+            async with self._global_semaphore:
+                try:
+                    with llm_request(Priority.JUROR, debate_id):
+                        outcomes = await asyncio.wait_for(jury.ajudge(**kwargs), timeout=self.timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(f"Jury timed out after {self.timeout}s in debate {debate_id}")
+                    outcomes = {}
+                except Exception as e:
+                    logger.error(f"Jury failed in debate {debate_id}: {str(e)}")
+                    outcomes = {}
+
+        for juror_id, outcome in outcomes.items():
+            if juror_id in keys:
+                self.cache.set(keys[juror_id], outcome)
+            results[juror_id] = outcome
+        await self._notify_done(on_done, results)
+        return results
+
+    @staticmethod
+    async def _notify_done(on_done, results: Dict[Any, Tuple[int, str]]):
+        if on_done is None:
+            return
+        for juror_id, (result, reasoning) in results.items():
+            await on_done(juror_id, result, reasoning)
+
+    async def judge_all(self, debate_id: str, requests: Dict[Any, Tuple[Juror, dict]],
+                        on_partial=None, on_done=None, cascade: bool = False) -> Dict[Any, Tuple[int, str]]:
+        """Run every juror of a round concurrently.
+
+        Args:
+            debate_id: Debate the round belongs to
+            requests: juror_id -> (juror, judge kwargs)
+            on_partial: Awaited as on_partial(juror_id, chunk) for each streamed reasoning chunk
+            on_done: Awaited as on_done(juror_id, result, reasoning) as soon as that juror finishes
+            cascade: Ask the fast model first and escalate only when needed
+
+        Returns:
+            juror_id -> (result, reasoning) for every juror that finished in time
+        """
+        async def run(juror_id, juror: Juror, kwargs: dict):
+            if on_partial is not None:
+                async def on_reasoning(chunk: str):
+                    await on_partial(juror_id, chunk)
+                kwargs = dict(kwargs, on_reasoning=on_reasoning)
+            outcome = await self.judge(debate_id, juror, cascade=cascade, **kwargs)
+            if outcome is not None and on_done is not None:
+                await on_done(juror_id, *outcome)
+            return outcome
+
+        juror_ids = list(requests.keys())
+        outcomes = await asyncio.gather(*[
+            run(juror_id, juror, kwargs) for juror_id, (juror, kwargs) in requests.items()
+        ])
+        return {
+            juror_id: outcome
+            for juror_id, outcome in zip(juror_ids, outcomes)
+            if outcome is not None
+        }
+
+
+juror_engine = JurorEngine()
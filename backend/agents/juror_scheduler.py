@@ -0,0 +1,135 @@
+import os
+import asyncio
+import logging
+from contextlib import nullcontext
+from typing import AsyncContextManager, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Messages arriving within this window are judged together in one juror round
+JUROR_DEBOUNCE_SECONDS = float(os.getenv("JUROR_DEBOUNCE_SECONDS", "1.5"))
+# Longest a round may hold its debate's cross-worker lock before the lock expires
+JUROR_ROUND_LOCK_TIMEOUT = float(os.getenv("JUROR_ROUND_LOCK_TIMEOUT", "300"))
+
+
+class _DebateRounds:
+    def __init__(self):
+        self.first_id: Optional[int] = None  # pending messages not yet taken by a round
+        self.last_id: Optional[int] = None
+        self.task: Optional[asyncio.Task] = None
+        self.running_range: Optional[Tuple[int, int]] = None
+        self.committing = False
+
+    def add_pending(self, first_id: int, last_id: int):
+        self.first_id = first_id if self.first_id is None else min(self.first_id, first_id)
+        self.last_id = last_id if self.last_id is None else max(self.last_id, last_id)
+
+
+class JurorRoundScheduler:
+    """Coalesces bursts of messages into one juror round per debate.
+
+    A round starts once no new message has arrived for `window` seconds and
+    covers every message since the previous round. A newer message cancels
+    a round that is still waiting on the jurors; its messages roll into the
+    next round. Once a round calls its `on_commit` callback it is left to
+    finish, and the next round starts after it.
+
+    `run_round(discussion_id, first_message_id, last_message_id, on_commit)`
+    does the actual judging and must call `on_commit()` right before it
+    writes results. `on_cancel(discussion_id, first_message_id, last_message_id)`,
+    if given, is awaited when a round that had started is cancelled, so
+    anything it already streamed can be retracted.
+
+    Debouncing and cancelling only see this worker's messages. With several
+    workers, pass `lock(name, timeout)` returning a lock shared by all of
+    them (see BroadcastBackend.lock): a round then waits for any round of
+    the same debate on another worker before taking its messages.
+    """
+
+    def __init__(self, run_round: Callable[..., Awaitable], window: float = JUROR_DEBOUNCE_SECONDS,
+                 on_cancel: Optional[Callable[..., Awaitable]] = None,
+                 lock: Optional[Callable[[str, float], AsyncContextManager]] = None,
+                 lock_timeout: float = JUROR_ROUND_LOCK_TIMEOUT):
+        self.run_round = run_round
+        self.window = window
+        self.on_cancel = on_cancel
+        self._lock = lock
+        self.lock_timeout = lock_timeout
+        self._debates: Dict[str, _DebateRounds] = {}
+        # Cancelled rounds still announcing their cancellation; the event loop only keeps weak references
+        self._cancelled: Set[asyncio.Task] = set()
+
+    def submit(self, discussion_id: int, message_id: int):
+        key = str(discussion_id)
+        state = self._debates.setdefault(key, _DebateRounds())
+        state.add_pending(message_id, message_id)
+
+        if state.task is not None and not state.task.done():
+            if state.committing:
+                # Let it finish writing; the pending messages get their own round afterwards
+                return
+            state.task.cancel()
+            self._cancelled.add(state.task)
+            state.task.add_done_callback(self._cancelled.discard)
+            if state.running_range is not None:
+                state.add_pending(*state.running_range)
+                state.running_range = None
+                logger.info(f"Cancelled stale juror round for debate {key}")
+
+        state.task = asyncio.create_task(self._run(key, discussion_id, state, self.window))
+
+    def lock(self, discussion_id: int) -> AsyncContextManager:
+        """Held while a round of the debate runs on any worker."""
+        if self._lock is None:
+            return nullcontext()
+        return self._lock(f"juror_round:{discussion_id}", self.lock_timeout)
+
+    async def drain(self, discussion_id: int):
+        """Judge any pending messages now and wait until every round of the debate has finished."""
+        key = str(discussion_id)
+        while True:
+            state = self._debates.get(key)
+            if state is None:
+                return
+            if state.task is None or state.task.done():
+                if state.first_id is None:
+                    self._debates.pop(key, None)
+                    return
+                state.task = asyncio.create_task(self._run(key, discussion_id, state, 0))
+            elif state.running_range is None:
+                # Still waiting out the debounce window: start the round right away
+                state.task.cancel()
+                state.task = asyncio.create_task(self._run(key, discussion_id, state, 0))
+            await asyncio.wait({state.task})
+
+    async def _run(self, key: str, discussion_id: int, state: _DebateRounds, delay: float):
+        round_range = None
+        try:
+            await asyncio.sleep(delay)
+            async with self.lock(discussion_id):
+                first_id, last_id = state.first_id, state.last_id
+                state.first_id = state.last_id = None
+                state.running_range = round_range = (first_id, last_id)
+
+                def on_commit():
+                    state.committing = True
+
+                await self.run_round(discussion_id, first_id, last_id, on_commit)
+        except asyncio.CancelledError:
+            if round_range is not None and self.on_cancel is not None:
+                try:
+                    await self.on_cancel(discussion_id, *round_range)
+                except Exception as e:
+                    logger.error(f"Error announcing cancelled juror round for debate {key}: {str(e)}")
+            return
+        except Exception as e:
+            logger.error(f"Error in juror round for debate {key}: {str(e)}")
+
+        # Only the round that ran to completion gets here
+        state.committing = False
+        state.running_range = None
+        state.task = None
+        if state.first_id is not None:
+            state.task = asyncio.create_task(self._run(key, discussion_id, state, self.window))
+        else:
+            self._debates.pop(key, None)
@@ -0,0 +1,219 @@
+import os
+import time
+import heapq
+import asyncio
+import logging
+import threading
+import itertools
+from enum import IntEnum
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+import dspy
+
+logger = logging.getLogger(__name__)
+
+# Provider limits for this process
+LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "500"))
+LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "200000"))
+# Completion tokens assumed per request when charging the tokens-per-minute bucket
+LLM_COMPLETION_TOKENS_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKENS_ESTIMATE", "500"))
+
+
+class Priority(IntEnum):
+    """Lower value is served first."""
+    DEBATE_SUMMARY = 0
+    JUROR = 1
+    CONVERSATION_SUMMARY = 2
+    PERSONA = 3
+    WARMUP = 4
+
+
+_request_context: ContextVar[Tuple[Priority, Optional[str]]] = ContextVar(
+    "llm_request_context", default=(Priority.JUROR, None)
+)
+
+
+@contextmanager
+def llm_request(priority: Priority, debate_id=None):
+    """Tag every LM call made inside the block with a priority class and debate."""
+    token = _request_context.set((priority, str(debate_id) if debate_id is not None else None))
+    try:
+        yield
+    finally:
+        _request_context.reset(token)
+
+
+class TokenBucket:
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (0 if it can be taken now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+class _Ticket:
+    def __init__(self, priority: Priority, debate_id: Optional[str], tokens: int, notify):
+        self.priority = priority
+        self.debate_id = debate_id
+        self.tokens = tokens
+        self.notify = notify
+        self.enqueued_at = time.monotonic()
+
+
+class LLMScheduler:
+    """Admission control for every LM request made by this process.
+
+    Requests wait in a priority queue until both the requests-per-minute and
+    the tokens-per-minute buckets can cover them. Within a priority class,
+    debates are served fairly (start-time fair queuing), so one busy debate
+    cannot starve the others. Usable from both threads and the event loop.
+    """
+
+    def __init__(self, rpm: int = LLM_RPM_LIMIT, tpm: int = LLM_TPM_LIMIT):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._lock = threading.Lock()
+        self._queue = []
+        self._seq = itertools.count()
+        self._class_vtime: Dict[Priority, int] = {}
+        self._debate_vtime: Dict[Tuple[Priority, Optional[str]], int] = {}
+        self.granted: Dict[str, int] = {priority.name: 0 for priority in Priority}
+        self.total_wait_seconds = 0.0
+
+    def _enqueue(self, ticket: _Ticket):
+        with self._lock:
+            key = (ticket.priority, ticket.debate_id)
+            vtime = max(self._class_vtime.get(ticket.priority, 0), self._debate_vtime.get(key, 0)) + 1
+            self._debate_vtime[key] = vtime
+            heapq.heappush(self._queue, (ticket.priority, vtime, next(self._seq), ticket))
+
+    def _try_grant(self, ticket: _Ticket, clear) -> Optional[float]:
+        """Grant ticket if it is at the head of the queue and both buckets can cover it.
+
+        Returns None when granted, otherwise the seconds to wait before
+        retrying (inf: wait until notified that the ticket reached the head).
+        """
+        with self._lock:
+            priority, vtime, _, head = self._queue[0]
+            if head is not ticket:
+                clear()
+                return float("inf")
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(ticket.tokens))
+            if wait > 0:
+                clear()
+                return wait
+            heapq.heappop(self._queue)
+            self.requests.take(1)
+            self.tokens.take(ticket.tokens)
+            self._class_vtime[priority] = vtime
+            self.granted[priority.name] += 1
+            self.total_wait_seconds += time.monotonic() - ticket.enqueued_at
+            if not self._debate_queued(ticket.priority, ticket.debate_id):
+                self._debate_vtime.pop((ticket.priority, ticket.debate_id), None)
+            if self._queue:
+                self._queue[0][3].notify()
+            return None
+
+    def _debate_queued(self, priority: Priority, debate_id: Optional[str]) -> bool:
+        return any(t.priority == priority and t.debate_id == debate_id for _, _, _, t in self._queue)
+
+    def acquire(self, priority: Priority, debate_id: Optional[str], tokens: int):
+        """Block the calling thread until the request may be sent."""
+        event = threading.Event()
+        ticket = _Ticket(priority, debate_id, tokens, event.set)
+        self._enqueue(ticket)
+        while True:
+            wait = self._try_grant(ticket, event.clear)
+            if wait is None:
+                return
+            event.wait(None if wait == float("inf") else wait)
+
+    async def aacquire(self, priority: Priority, debate_id: Optional[str], tokens: int):
+        """Wait on the event loop until the request may be sent."""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        ticket = _Ticket(priority, debate_id, tokens, lambda: loop.call_soon_threadsafe(event.set))
+        self._enqueue(ticket)
+        try:
+            while True:
+                wait = self._try_grant(ticket, event.clear)
+                if wait is None:
+                    return
+                try:
+                    await asyncio.wait_for(event.wait(), None if wait == float("inf") else wait)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            self._withdraw(ticket)
+            raise
+
+    def _withdraw(self, ticket: _Ticket):
+        with self._lock:
+            self._queue = [entry for entry in self._queue if entry[3] is not ticket]
+            heapq.heapify(self._queue)
+            if self._queue:
+                self._queue[0][3].notify()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            depth_by_priority = {priority.name: 0 for priority in Priority}
+            depth_by_debate: Dict[str, int] = {}
+            for priority, _, _, ticket in self._queue:
+                depth_by_priority[priority.name] += 1
+                debate = ticket.debate_id or "none"
+                depth_by_debate[debate] = depth_by_debate.get(debate, 0) + 1
+            granted_total = sum(self.granted.values())
+            return {
+                "queue_depth": len(self._queue),
+                "queue_depth_by_priority": depth_by_priority,
+                "queue_depth_by_debate": depth_by_debate,
+                "granted": dict(self.granted),
+                "average_wait_seconds": self.total_wait_seconds / granted_total if granted_total else 0.0,
+                "requests_available": self.requests.tokens,
+                "tokens_available": self.tokens.tokens
+            }
+
+
+def estimate_request_tokens(prompt=None, messages=None) -> int:
+    text = prompt or ""
+    for message in messages or []:
+        text += str(message.get("content", ""))
+    return len(text) // 4 + LLM_COMPLETION_TOKENS_ESTIMATE
+
+
+llm_scheduler = LLMScheduler()
+
+
+class ScheduledLM(dspy.LM):
+    """dspy.LM whose every request is admitted by the shared LLMScheduler.
+
+    The priority class and debate come from the enclosing llm_request block.
+    """
+
+    def __call__(self, prompt=None, *, messages=None, **kwargs):
+        priority, debate_id = _request_context.get()
+        llm_scheduler.acquire(priority, debate_id, estimate_request_tokens(prompt, messages))
+        return super().__call__(prompt, messages=messages, **kwargs)
+
+    async def acall(self, prompt=None, *, messages=None, **kwargs):
+        priority, debate_id = _request_context.get()
+        await llm_scheduler.aacquire(priority, debate_id, estimate_request_tokens(prompt, messages))
+        return await super().acall(prompt, messages=messages, **kwargs)
@@ -0,0 +1,76 @@
+import os
+import logging
+import threading
+from typing import Callable, Dict
+
+import dspy
+
+from backend.agents.llm_scheduler import Priority, llm_request
+
+logger = logging.getLogger(__name__)
+
+# Directory of optimized programs saved with `module.save(f"{name}.json")`
+DSPY_COMPILED_DIR = os.getenv("DSPY_COMPILED_DIR")
+# Issue one real LLM call at startup so the first juror round does not pay for cold connections
+DSPY_WARMUP = os.getenv("DSPY_WARMUP", "false").lower() in ("1", "true", "yes")
+
+
+class ModuleRegistry:
+    """Process-wide dspy predictors, built once and shared by every request.
+
+    Agents register a factory per predictor name at import time; the
+    predictor is built on first use (or eagerly by build_all at startup) and
+    loaded from `DSPY_COMPILED_DIR/<name>.json` when an optimized program
+    has been saved there.
+    """
+
+    def __init__(self, compiled_dir: str = DSPY_COMPILED_DIR):
+        self.compiled_dir = compiled_dir
+        self._factories: Dict[str, Callable[[], dspy.Module]] = {}
+        self._modules: Dict[str, dspy.Module] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], dspy.Module]):
+        self._factories[name] = factory
+
+    def _build(self, name: str) -> dspy.Module:
+        module = self._factories[name]()
+        if self.compiled_dir:
+            path = os.path.join(self.compiled_dir, f"{name}.json")
+            if os.path.exists(path):
+                module.load(path)
+                logger.info(f"Loaded compiled dspy program for {name} from {path}")
+        return module
+
+    def get(self, name: str) -> dspy.Module:
+        module = self._modules.get(name)
+        if module is None:
+            with self._lock:
+                module = self._modules.get(name)
+                if module is None:
+                    module = self._modules[name] = self._build(name)
+        return module
+
+    def build_all(self):
+        for name in self._factories:
+            self.get(name)
+
+    async def warm_up(self):
+        """Make one small juror call to open provider connections before real traffic."""
+        try:
+            with llm_request(Priority.WARMUP):
+                await self.get("juror").acall(
+                    persona="A neutral observer.",
+                    topic="Warm-up",
+                    sides="0: Yes\n1: No\n",
+                    conv_history="",
+                    past_reasoning="",
+                    previous_decision=-1,
+                    new_message="Warm-up: hello"
+                )
+            logger.info("dspy warm-up call completed")
+        except Exception as e:
+            logger.error(f"dspy warm-up call failed: {str(e)}")
+
+
+modules = ModuleRegistry()
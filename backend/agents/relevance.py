@@ -0,0 +1,143 @@
+import os
+import re
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+# Messages scoring below this lexical overlap with the debate are treated as off-topic
+RELEVANCE_THRESHOLD = float(os.getenv("RELEVANCE_THRESHOLD", "0.1"))
+# Opt-in: word overlap misses arguments that bring in new vocabulary ("what about the security budget?")
+RELEVANCE_OFF_TOPIC_ENABLED = os.getenv("RELEVANCE_OFF_TOPIC_ENABLED", "false").lower() in ("1", "true", "yes")
+RELEVANCE_MIN_WORDS = int(os.getenv("RELEVANCE_MIN_WORDS", "3"))
+# Messages at least this long always go to the jurors, whatever their overlap score
+RELEVANCE_LONG_MESSAGE_WORDS = int(os.getenv("RELEVANCE_LONG_MESSAGE_WORDS", "25"))
+RELEVANCE_FILTER_ENABLED = os.getenv("RELEVANCE_FILTER_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# How many distinct recent messages per debate are remembered for duplicate detection
+DUPLICATE_HISTORY = 50
+# Upper bound on the per-debate vocabulary built from relevant messages
+MAX_VOCABULARY = 2000
+
+GREETING_PATTERN = re.compile(
+    r"^(hi|hello|hey|yo|gm|gn|good (morning|afternoon|evening|night)|thanks|thank you|thx|ty|"
+    r"lol|lmao|ok|okay|k|cool|nice|yes|no|yep|nope|bye|\+1|agreed?)[\s!.?]*$",
+    re.IGNORECASE
+)
+# Scripts written without spaces between words (Thai, Lao, Myanmar, Khmer, kana, Han);
+# runs of them are split into overlapping character pairs instead of words
+UNSPACED_CHARACTERS = "\u0e00-\u0eff\u1000-\u109f\u1780-\u17ff\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+UNSPACED_PATTERN = re.compile(f"[{UNSPACED_CHARACTERS}]+")
+WORD_PATTERN = re.compile(f"[{UNSPACED_CHARACTERS}]+|[^\\W{UNSPACED_CHARACTERS}]+")
+URL_PATTERN = re.compile(r"https?://\S+")
+REPEATED_CHAR_PATTERN = re.compile(r"(.)\1{9,}")
+
+STOPWORDS = {
+    "the", "and", "for", "are", "but", "not", "you", "all", "any", "can", "had", "her", "was", "one",
+    "our", "out", "has", "have", "him", "his", "how", "its", "may", "who", "did", "get", "got", "let",
+    "she", "too", "use", "that", "this", "with", "from", "they", "them", "then", "than", "what", "when",
+    "will", "would", "should", "could", "there", "their", "about", "which", "were", "been", "being",
+    "just", "also", "into", "your", "more", "some", "such", "only", "very", "much", "like", "think",
+}
+
+
+def split_words(text: str) -> List[str]:
+    """Lowercased words in any script; runs of unspaced scripts become overlapping character bigrams."""
+    words = []
+    for word in WORD_PATTERN.findall(text.lower()):
+        if UNSPACED_PATTERN.match(word) and len(word) > 1:
+            words.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            words.append(word)
+    return words
+
+
+def tokenize(text: str) -> set:
+    tokens = set()
+    for word in split_words(text):
+        if UNSPACED_PATTERN.match(word):
+            tokens.add(word)
+        elif len(word) > 2 and word not in STOPWORDS:
+            tokens.add(word.rstrip("s"))
+    return tokens
+
+
+def normalize(text: str) -> str:
+    return " ".join(split_words(text))
+
+
+class RelevanceFilter:
+    """Cheap local check of whether a message can change any juror's mind.
+
+    A message is irrelevant if it is too short, a greeting, spam, or an
+    exact repeat of a recent message in the same debate. With off_topic, it
+    is also irrelevant if it shares too little vocabulary with the topic,
+    the sides and earlier relevant messages.
+    """
+
+    def __init__(self, threshold: float = RELEVANCE_THRESHOLD, min_words: int = RELEVANCE_MIN_WORDS,
+                 long_message_words: int = RELEVANCE_LONG_MESSAGE_WORDS, off_topic: bool = RELEVANCE_OFF_TOPIC_ENABLED):
+        self.threshold = threshold
+        self.off_topic = off_topic
+        self.min_words = min_words
+        self.long_message_words = long_message_words
+        # normalized text digest -> id of the first message seen with that text
+        self._seen: Dict[str, "OrderedDict[str, int]"] = {}
+        self._vocabulary: Dict[str, set] = {}
+
+    def _debate_vocabulary(self, key: str, topic: str, sides: List[str]) -> set:
+        if key not in self._vocabulary:
+            vocabulary = tokenize(topic)
+            for side in sides:
+                vocabulary |= tokenize(side)
+            self._vocabulary[key] = vocabulary
+        return self._vocabulary[key]
+
+    def check(self, discussion_id, message_id: int, topic: str, sides: List[str], message: str) -> Tuple[bool, str]:
+        """Returns (is_relevant, reason).
+
+        Checking the same message again (a cancelled round re-run) gives the
+        same answer: only an earlier message with the same text makes it a
+        duplicate.
+        """
+        key = str(discussion_id)
+        text = message.strip()
+        normalized = normalize(text)
+        words = normalized.split()
+
+        seen = self._seen.setdefault(key, OrderedDict())
+        digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+        is_duplicate = seen.get(digest, message_id) < message_id
+        if digest not in seen:
+            seen[digest] = message_id
+            while len(seen) > DUPLICATE_HISTORY:
+                seen.popitem(last=False)
+
+        if GREETING_PATTERN.match(text):
+            return False, "greeting"
+        if len(words) < self.min_words:
+            return False, "too_short"
+        if REPEATED_CHAR_PATTERN.search(text) or not URL_PATTERN.sub("", text).strip():
+            return False, "spam"
+        if is_duplicate:
+            return False, "duplicate"
+        if not self.off_topic:
+            return True, "relevant"
+
+        vocabulary = self._debate_vocabulary(key, topic, sides)
+        tokens = tokenize(text)
+        if len(words) < self.long_message_words:
+            score = len(tokens & vocabulary) / len(tokens) if tokens else 0.0
+            if score < self.threshold:
+                return False, "off_topic"
+
+        if len(vocabulary) < MAX_VOCABULARY:
+            vocabulary |= tokens
+        return True, "relevant"
+
+    def forget(self, discussion_id):
+        key = str(discussion_id)
+        self._seen.pop(key, None)
+        self._vocabulary.pop(key, None)
+
+
+relevance_filter = RelevanceFilter()
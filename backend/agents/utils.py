@@ -1,15 +1,38 @@
 import dspy
+from backend.agents.registry import modules
 
 def generate_juror_persona(topic: str):
-    f = dspy.ChainOfThought(PersonaGeneration)
+    f = modules.get("persona")
     response = f(topic=topic)
     return response.persona
 
 def summarize_debate(topic: str, sides: list[str], messages: str):
-    f = dspy.ChainOfThought(DebateSummarizer)
+    f = modules.get("debate_summary")
     response = f(topic=topic, sides=sides, messages=messages)
     return response.summary
 
+async def asummarize_debate(topic: str, sides: list[str], messages: str):
+    f = modules.get("debate_summary")
+    response = await f.acall(topic=topic, sides=sides, messages=messages)
+    return response.summary
+
+async def asummarize_conversation(previous_summary: str, messages: str):
+    f = modules.get("conversation_summary")
+    response = await f.acall(previous_summary=previous_summary, messages=messages)
+    return response.summary
+
+class ConversationSummarizer(dspy.Signature):
+    """
+    Maintain a rolling summary of an ongoing debate.
+    Guidelines:
+    1. Fold the new messages into the previous summary.
+    2. Keep every distinct argument and who made it, drop greetings and repetition.
+    3. Be short and concise, no more than a few sentences per side.
+    """
+    previous_summary = dspy.InputField(prefix="Previous Summary：")
+    messages = dspy.InputField(prefix="New Messages：")
+    summary = dspy.OutputField(prefix="Summary：")
+
 class DebateSummarizer(dspy.Signature):
     """
     Summarize a debate given a topic and a list of messages.
@@ -35,4 +58,9 @@ class PersonaGeneration(dspy.Signature):
     3. Generate persona to represent a diverse group of stake holders.
     """
     topic = dspy.InputField(prefix="Topic：")
-    persona:list[str] = dspy.OutputField(prefix="Persona：")
\ No newline at end of file
+    persona:list[str] = dspy.OutputField(prefix="Persona：")
+
+
+modules.register("persona", lambda: dspy.ChainOfThought(PersonaGeneration))
+modules.register("debate_summary", lambda: dspy.ChainOfThought(DebateSummarizer))
+modules.register("conversation_summary", lambda: dspy.ChainOfThought(ConversationSummarizer))
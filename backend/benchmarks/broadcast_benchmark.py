@@ -0,0 +1,111 @@
+"""Compare per-subscriber send_json against encode-once broadcasting.
+
+Usage: python -m backend.benchmarks.broadcast_benchmark [--subscribers 1000] [--rounds 20]
+"""
+import json
+import time
+import asyncio
+import argparse
+
+from backend.realtime.encoding import encode_message, orjson
+from backend.realtime.connection_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    """Records frames instead of writing them; send_json encodes like Starlette does."""
+
+    def __init__(self):
+        self.frames = 0
+
+    async def accept(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def send_text(self, data: str):
+        self.frames += 1
+
+    async def send_json(self, data):
+        await self.send_text(json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+
+
+def sample_payloads():
+    new_message = {
+        "type": "new_message",
+        "data": {
+            "id": 4821,
+            "discussion_id": 17,
+            "user_address": "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed",
+            "username": "alice",
+            "message": "Staking rewards should be cut because inflation is outpacing treasury growth. " * 3,
+            "stance": "Cut rewards",
+            "timestamp": "2026-10-17T12:00:00"
+        }
+    }
+    juror_response = {
+        "type": "juror_response",
+        "message_id": 4821,
+        "first_message_id": 4819,
+        "last_message_id": 4821,
+        "responses": {
+            juror_id: {
+                "result": juror_id % 2,
+                "reasoning": "The latest argument ties reward levels to measurable treasury outflows, " * 8,
+                "carried_forward": False
+            } for juror_id in range(1, 6)
+        }
+    }
+    return {"new_message": new_message, "juror_response": juror_response}
+
+
+async def run_baseline(message: dict, subscribers: int, rounds: int) -> float:
+    """The old path: every subscriber serializes the payload itself."""
+    sockets = [FakeWebSocket() for _ in range(subscribers)]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for websocket in sockets:
+            await websocket.send_json(message)
+    return time.perf_counter() - start
+
+
+async def run_encode_once(message: dict, subscribers: int, rounds: int) -> float:
+    """The current path: ConnectionManager encodes once, writer tasks send the same frame."""
+    manager = ConnectionManager(max_queue=rounds + 1)
+    await manager.start()
+    sockets = [FakeWebSocket() for _ in range(subscribers)]
+    connections = [await manager.connect(websocket, "bench", f"client{i}") for i, websocket in enumerate(sockets)]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await manager.broadcast_message("bench", message)
+    while any(not connection.queue.empty() for connection in connections):
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    for connection in connections:
+        await connection.close()
+    return elapsed
+
+
+def report(name: str, elapsed: float, subscribers: int, rounds: int) -> str:
+    per_broadcast_ms = elapsed / rounds * 1000
+    return f"{name:<13} {per_broadcast_ms:8.2f} ms/broadcast  {subscribers * rounds / elapsed:12,.0f} frames/s"
+
+
+async def main(subscribers: int, rounds: int):
+    print(f"encoder: {'orjson' if orjson is not None else 'json'}, subscribers: {subscribers}, rounds: {rounds}")
+    for name, message in sample_payloads().items():
+        frame_size = len(encode_message(message))
+        baseline = await run_baseline(message, subscribers, rounds)
+        encode_once = await run_encode_once(message, subscribers, rounds)
+        print(f"\n{name} ({frame_size} bytes)")
+        print(report("send_json", baseline, subscribers, rounds))
+        print(report("encode once", encode_once, subscribers, rounds))
+        print(f"speedup       {baseline / encode_once:8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.subscribers, args.rounds))
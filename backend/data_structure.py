@@ -11,6 +11,7 @@ class ChatMessage:
     username: Optional[str] = None
     timestamp: Optional[datetime] = None
     stance: Optional[str] = None
+    id: Optional[int] = None  # set on messages read back from the database; the cursor for /msg paging
 
 @dataclass
 class GeneratePersonasRequest:
@@ -32,6 +33,11 @@ class Side(BaseModel):
     id: str
     description: str
 
+class JurorVerdict(BaseModel):
+    juror_id: int
+    correct_side_id: int
+    reasoning: str
+
 class Debate(BaseModel):
     discussion_id: Optional[int] = None
     topic: str
@@ -41,3 +47,5 @@ class Debate(BaseModel):
     action: str
     creator_address: str
     creator_username: str
+    juror_mode: str = "individual"  # "individual" or "batched"
+    juror_cascade: bool = False  # try the fast model first, escalate to MODEL only when needed
@@ -1,12 +1,92 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
-    DATABASE_URL = "sqlite:///./sql_app.db"
+    raise ValueError("DATABASE_URL is not set in the environment variables")
 
-engine = create_engine(DATABASE_URL)
+# Connection pool shared by every table module in this process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Seconds before a pooled connection is replaced (keeps clear of server/proxy idle timeouts)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Test each connection on checkout so one dropped by the server is replaced instead of failing a request
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Create missing tables when the app starts; turn off where schema changes go through migrations
+DB_CREATE_TABLES = os.getenv("DB_CREATE_TABLES", "true").lower() in ("1", "true", "yes")
+
+
+def _engine_options() -> dict:
+    return {
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+
+
+def _async_url(url: str) -> str:
+    """The same database through asyncpg.
+
+    Only PostgreSQL is supported: the table modules use its upserts,
+    DISTINCT ON and GREATEST, and SCHEMA_UPGRADES uses its ALTER TABLE forms.
+    """
+    scheme, rest = url.split("://", 1)
+    if not scheme.startswith("postgres"):
+        raise ValueError(f"DATABASE_URL must be a PostgreSQL URL, got {scheme}://")
+    return f"postgresql+asyncpg://{rest}"
+
+
+engine = create_engine(DATABASE_URL, **_engine_options())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+
+# Used by the async request handlers so a slow query does not block the event loop
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options())
+# Objects stay readable after commit, as handlers keep using them to build broadcasts
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Columns added to existing tables after they were first created; create_all never adds columns.
+# Each statement is idempotent and they run in order on every init_db().
+SCHEMA_UPGRADES = [
+    "ALTER TABLE debates ADD COLUMN IF NOT EXISTS juror_mode VARCHAR(32) DEFAULT 'individual'",
+    "ALTER TABLE debates ADD COLUMN IF NOT EXISTS juror_cascade BOOLEAN DEFAULT false",
+    "ALTER TABLE juror_results ADD COLUMN IF NOT EXISTS carried_forward BOOLEAN DEFAULT false",
+    "ALTER TABLE juror_states ADD COLUMN IF NOT EXISTS sent_result INTEGER",
+    "ALTER TABLE juror_states ADD COLUMN IF NOT EXISTS sent_reasoning VARCHAR",
+    "ALTER TABLE debates ADD COLUMN IF NOT EXISTS message_count INTEGER",
+    "ALTER TABLE debates ADD COLUMN IF NOT EXISTS last_message_id INTEGER",
+    "ALTER TABLE debates ADD COLUMN IF NOT EXISTS last_activity_at TIMESTAMP",
+    # Debates created before the counters existed; counted rows are never NULL, so this runs once
+    """UPDATE debates SET
+        message_count = (SELECT count(*) FROM chat_messages WHERE chat_messages.discussion_id = debates.discussion_id),
+        last_message_id = (SELECT max(id) FROM chat_messages WHERE chat_messages.discussion_id = debates.discussion_id),
+        last_activity_at = (SELECT max(created_at) FROM chat_messages WHERE chat_messages.discussion_id = debates.discussion_id)
+    WHERE message_count IS NULL""",
+    "ALTER TABLE debates ALTER COLUMN message_count SET DEFAULT 0",
+]
+
+
+def init_db():
+    """Create any missing tables. Run once at startup (or from a migration step), not on import."""
+    # Importing the table modules registers their models on Base.metadata
+    from backend.database import chat_message, debate, juror, privy_data, user  # noqa: F401
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        for statement in SCHEMA_UPGRADES:
+            connection.execute(text(statement))
+    # create_all skips tables that already exist; add indexes declared since they were created
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        juror.backfill_juror_states(db)
+    finally:
+        db.close()
@@ -1,12 +1,8 @@
-import os
 from datetime import datetime
 from typing import List, Optional
-from sqlalchemy import create_engine, Column, Integer, String, DateTime
-from sqlalchemy.ext.declarative import declarative_base
-
-DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL)
-Base = declarative_base()
+from sqlalchemy import Column, Integer, String, DateTime, Index, select, update, func
+from . import Base
+from .debate import DebateDB
 
 # Chat model
 class ChatMessageDB(Base):
@@ -19,6 +15,22 @@ class ChatMessageDB(Base):
     message = Column(String)
     stance = Column(String, nullable=True)  # 添加 stance 字段，允许为空
     created_at = Column(DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        # Serves every "messages of a discussion around id X" query (pages, replays, juror rounds)
+        Index('ix_chat_messages_discussion_id_id', 'discussion_id', 'id'),
+    )
+
+def _count_message(message: ChatMessageDB):
+    """Bump the debate's message counters; a row-level update, so concurrent posts cannot lose a count."""
+    return update(DebateDB)\
+        .where(DebateDB.discussion_id == message.discussion_id)\
+        .values(
+            message_count=func.coalesce(DebateDB.message_count, 0) + 1,
+            # Ids are assigned before the row lock is taken, so concurrent posts can arrive out of order
+            last_message_id=func.greatest(DebateDB.last_message_id, message.id),
+            last_activity_at=func.greatest(DebateDB.last_activity_at, message.created_at)
+        )\
+        .execution_options(synchronize_session=False)
 
 # Database operations for chat
 def create_chat_message(db, discussion_id: int, user_address: str, message: str, username: Optional[str] = None, stance: Optional[str] = None):
@@ -31,6 +43,8 @@ def create_chat_message(db, discussion_id: int, user_address: str, message: str,
         created_at=datetime.utcnow()
     )
     db.add(new_message)
+    db.flush()
+    db.execute(_count_message(new_message))
     db.commit()
     db.refresh(new_message)
     return new_message
@@ -41,5 +55,61 @@ def get_chat_history(db, discussion_id: int) -> List[ChatMessageDB]:
         .order_by(ChatMessageDB.created_at.asc())\
         .all()
 
+def get_chat_messages_after(db, discussion_id: int, after_id: int, upto_id: Optional[int] = None, limit: Optional[int] = None) -> List[ChatMessageDB]:
+    """Messages of a discussion with id > after_id (and <= upto_id if given), oldest first."""
+    query = db.query(ChatMessageDB)\
+        .filter(ChatMessageDB.discussion_id == discussion_id)\
+        .filter(ChatMessageDB.id > after_id)
+    if upto_id is not None:
+        query = query.filter(ChatMessageDB.id <= upto_id)
+    return query.order_by(ChatMessageDB.id.asc()).limit(limit).all()
+
+def _messages_before_query(discussion_id: int, before_id: Optional[int], limit: int):
+    query = select(ChatMessageDB).filter(ChatMessageDB.discussion_id == discussion_id)
+    if before_id is not None:
+        query = query.filter(ChatMessageDB.id < before_id)
+    return query.order_by(ChatMessageDB.id.desc()).limit(limit)
+
+def get_chat_messages_before(db, discussion_id: int, before_id: Optional[int], limit: int) -> List[ChatMessageDB]:
+    """The newest `limit` messages with id < before_id (or the newest overall), oldest first."""
+    messages = db.execute(_messages_before_query(discussion_id, before_id, limit)).scalars().all()
+    return list(reversed(messages))
+
+
+# Async variants, for sessions from AsyncSessionLocal
+async def acreate_chat_message(db, discussion_id: int, user_address: str, message: str, username: Optional[str] = None, stance: Optional[str] = None):
+    new_message = ChatMessageDB(
+        discussion_id=discussion_id,
+        user_address=user_address,
+        username=username,
+        message=message,
+        stance=stance,
+        created_at=datetime.utcnow()
+    )
+    db.add(new_message)
+    await db.flush()
+    await db.execute(_count_message(new_message))
+    await db.commit()
+    await db.refresh(new_message)
+    return new_message
+
+async def aget_chat_history(db, discussion_id: int) -> List[ChatMessageDB]:
+    result = await db.execute(
+        select(ChatMessageDB)
+        .filter(ChatMessageDB.discussion_id == discussion_id)
+        .order_by(ChatMessageDB.created_at.asc())
+    )
+    return list(result.scalars().all())
+
+async def aget_chat_messages_after(db, discussion_id: int, after_id: int, upto_id: Optional[int] = None, limit: Optional[int] = None) -> List[ChatMessageDB]:
+    query = select(ChatMessageDB)\
+        .filter(ChatMessageDB.discussion_id == discussion_id)\
+        .filter(ChatMessageDB.id > after_id)
+    if upto_id is not None:
+        query = query.filter(ChatMessageDB.id <= upto_id)
+    result = await db.execute(query.order_by(ChatMessageDB.id.asc()).limit(limit))
+    return list(result.scalars().all())
 
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+async def aget_chat_messages_before(db, discussion_id: int, before_id: Optional[int], limit: int) -> List[ChatMessageDB]:
+    result = await db.execute(_messages_before_query(discussion_id, before_id, limit))
+    return list(reversed(result.scalars().all()))
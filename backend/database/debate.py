@@ -1,8 +1,8 @@
 import json
 from datetime import datetime
 from typing import List
-from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Text, Float, ARRAY, Boolean
-from . import Base, engine
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Text, Float, ARRAY, Boolean, select, update
+from . import Base
 
 # Debate model
 class DebateDB(Base):
@@ -17,11 +17,17 @@ class DebateDB(Base):
     action = Column(Text)  # 使用 Text 而不是 String
     creator_address = Column(String(255))  # 指定长度的 String
     is_ended = Column(Boolean, default=False)
+    juror_mode = Column(String(32), default="individual")  # "batched" judges all jurors in one LLM call
+    juror_cascade = Column(Boolean, default=False)  # fast model first, strong model only on flips / low confidence
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Kept up to date by create_chat_message, in the same transaction as the message insert
+    message_count = Column(Integer, default=0, server_default="0")
+    last_message_id = Column(Integer, nullable=True)
+    last_activity_at = Column(DateTime, nullable=True)
 
 
 # Database operations for debate
-def create_debate(db, discussion_id: int, topic: str, sides: List[str], juror_ids: List[int], funding: float, action: str, creator_address: str):
+def create_debate(db, discussion_id: int, topic: str, sides: List[str], juror_ids: List[int], funding: float, action: str, creator_address: str, juror_mode: str = "individual", juror_cascade: bool = False):
     try:
         new_debate = DebateDB(
             discussion_id=discussion_id,
@@ -31,6 +37,8 @@ def create_debate(db, discussion_id: int, topic: str, sides: List[str], juror_id
             funding=funding,
             action=action,
             creator_address=creator_address,
+            juror_mode=juror_mode,
+            juror_cascade=juror_cascade,
             created_at=datetime.utcnow()
         )
         db.add(new_debate)
@@ -49,5 +57,34 @@ def update_debate_status(db, discussion_id: int, is_ended: bool):
         debate.is_ended = is_ended
         db.commit()
 
-# 只创建不存在的表
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+def _end_if_full_query(discussion_id: int, max_messages: int):
+    return update(DebateDB)\
+        .where(DebateDB.discussion_id == discussion_id)\
+        .where(DebateDB.is_ended.isnot(True))\
+        .where(DebateDB.message_count >= max_messages)\
+        .values(is_ended=True)\
+        .returning(DebateDB.id)\
+        .execution_options(synchronize_session=False)
+
+def end_debate_if_full(db, discussion_id: int, max_messages: int) -> bool:
+    """Mark the debate ended once it holds max_messages messages; True only for the call that ended it."""
+    ended = db.execute(_end_if_full_query(discussion_id, max_messages)).first() is not None
+    db.commit()
+    return ended
+
+
+# Async variants, for sessions from AsyncSessionLocal
+async def aget_debate(db, discussion_id: int) -> DebateDB:
+    result = await db.execute(select(DebateDB).filter(DebateDB.discussion_id == discussion_id))
+    return result.scalars().first()
+
+async def aupdate_debate_status(db, discussion_id: int, is_ended: bool):
+    debate = await aget_debate(db, discussion_id)
+    if debate:
+        debate.is_ended = is_ended
+        await db.commit()
+
+async def aend_debate_if_full(db, discussion_id: int, max_messages: int) -> bool:
+    ended = (await db.execute(_end_if_full_query(discussion_id, max_messages))).first() is not None
+    await db.commit()
+    return ended
@@ -1,12 +1,9 @@
-import os
 from datetime import datetime
-from typing import List
-from sqlalchemy import create_engine, Column, BigInteger, Integer, String, DateTime, UniqueConstraint
-from sqlalchemy.ext.declarative import declarative_base
-
-DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL)
-Base = declarative_base()
+from itertools import groupby
+from typing import Dict, List, Optional
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Boolean, UniqueConstraint, select, update
+from sqlalchemy.dialects.postgresql import insert
+from . import Base
 
 # Juror model
 class JurorDB(Base):
@@ -29,8 +26,75 @@ class JurorResultDB(Base):
     latest_msg_id = Column(Integer, index=True)
     result = Column(Integer)
     reasoning = Column(String)
+    carried_forward = Column(Boolean, default=False)  # copied from the previous result, no LLM call
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class JurorStateDB(Base):
+    """Each juror's most recent result, kept in step with juror_results by create_juror_result."""
+    __tablename__ = "juror_states"
+
+    discussion_id = Column(BigInteger, primary_key=True)
+    juror_id = Column(Integer, primary_key=True)
+    result_id = Column(Integer)  # juror_results.id of the row this mirrors
+    latest_msg_id = Column(Integer)
+    result = Column(Integer)
+    reasoning = Column(String)
+    carried_forward = Column(Boolean, default=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    # What clients were last broadcast for this juror; the baseline for juror_delta events
+    sent_result = Column(Integer, nullable=True)
+    sent_reasoning = Column(String, nullable=True)
+
+def _upsert_juror_state(juror_result: JurorResultDB):
+    values = {
+        "discussion_id": juror_result.discussion_id,
+        "juror_id": juror_result.juror_id,
+        "result_id": juror_result.id,
+        "latest_msg_id": juror_result.latest_msg_id,
+        "result": juror_result.result,
+        "reasoning": juror_result.reasoning,
+        "carried_forward": juror_result.carried_forward,
+        "updated_at": juror_result.created_at,
+    }
+    statement = insert(JurorStateDB).values(**values)
+    return statement.on_conflict_do_update(
+        index_elements=[JurorStateDB.discussion_id, JurorStateDB.juror_id],
+        set_={key: statement.excluded[key] for key in values if key not in ("discussion_id", "juror_id")}
+    )
+
+def _group_by_juror(rows: List[JurorResultDB]) -> List[List[JurorResultDB]]:
+    return [list(results) for _, results in groupby(rows, key=lambda r: r.juror_id)]
+
+def _juror_history_query(discussion_id: int):
+    return select(JurorResultDB)\
+        .filter(JurorResultDB.discussion_id == discussion_id)\
+        .order_by(JurorResultDB.juror_id, JurorResultDB.created_at.asc(), JurorResultDB.id.asc())
+
+def _juror_result_before_query(juror_id: int, discussion_id: int, before_msg_id: int):
+    return select(JurorResultDB)\
+        .filter(JurorResultDB.juror_id == juror_id)\
+        .filter(JurorResultDB.discussion_id == discussion_id)\
+        .filter(JurorResultDB.latest_msg_id < before_msg_id)\
+        .order_by(JurorResultDB.created_at.desc(), JurorResultDB.id.desc())\
+        .limit(1)
+
+def backfill_juror_states(db):
+    """Fill juror_states from juror_results when it is still empty (first start after it was added)."""
+    if db.query(JurorStateDB).first() is not None:
+        return
+    latest = select(
+        JurorResultDB.discussion_id, JurorResultDB.juror_id, JurorResultDB.id, JurorResultDB.latest_msg_id,
+        JurorResultDB.result, JurorResultDB.reasoning, JurorResultDB.carried_forward, JurorResultDB.created_at
+    ).distinct(JurorResultDB.discussion_id, JurorResultDB.juror_id)\
+        .order_by(JurorResultDB.discussion_id, JurorResultDB.juror_id, JurorResultDB.created_at.desc(), JurorResultDB.id.desc())
+    db.execute(
+        insert(JurorStateDB).from_select(
+            ["discussion_id", "juror_id", "result_id", "latest_msg_id", "result", "reasoning", "carried_forward", "updated_at"],
+            latest
+        ).on_conflict_do_nothing()
+    )
+    db.commit()
+
 # Database operations for juror
 def create_juror(db, discussion_id: int, juror_id: int, persona: str):
     new_juror = JurorDB(
@@ -46,16 +110,20 @@ def get_jurors(db, discussion_id: int) -> List[JurorDB]:
     jurors = db.query(JurorDB).filter(JurorDB.discussion_id == discussion_id).all()
     return jurors
 
-def create_juror_result(db, juror_id: int, discussion_id: int, latest_msg_id: int, result: str, reasoning: str):
+def create_juror_result(db, juror_id: int, discussion_id: int, latest_msg_id: int, result: str, reasoning: str, carried_forward: bool = False):
     new_message = JurorResultDB(
         juror_id=juror_id,
         discussion_id=discussion_id,
         latest_msg_id=latest_msg_id,
         result=result,
         reasoning=reasoning,
+        carried_forward=carried_forward,
         created_at=datetime.utcnow()
     )
     db.add(new_message)
+    db.flush()
+    # Same transaction as the history row, so the two never disagree
+    db.execute(_upsert_juror_state(new_message))
     db.commit()
     db.refresh(new_message)
     return new_message
@@ -68,20 +136,79 @@ def get_juror_result(db, juror_id: int, discussion_id: int) -> List[JurorResultD
         .all()
         
 def get_all_juror_results(db, discussion_id: int) -> List[List[JurorResultDB]]:
-    # get all juror ids where discussion id is the same
-    juror_ids = db.query(JurorResultDB.juror_id)\
-        .filter(JurorResultDB.discussion_id == discussion_id)\
-        .distinct()\
-        .all()
-    
-    # 从 Row 对象中提取实际的 juror_id 值
-    juror_ids = [row[0] for row in juror_ids]
-    
-    # get all juror results for each juror id
-    juror_results = []
-    for juror_id in juror_ids:
-        juror_results.append(get_juror_result(db, juror_id, discussion_id))
-    return juror_results
-
-
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    """Every juror's results, oldest first, one list per juror (ordered by juror_id)."""
+    return _group_by_juror(db.execute(_juror_history_query(discussion_id)).scalars().all())
+
+def get_juror_states(db, discussion_id: int) -> Dict[int, JurorStateDB]:
+    """Each juror's latest result, keyed by juror_id."""
+    # juror_states is written with core upserts; refresh rows this session already holds
+    states = db.query(JurorStateDB).filter(JurorStateDB.discussion_id == discussion_id)\
+        .populate_existing().all()
+    return {state.juror_id: state for state in states}
+
+def get_juror_result_before(db, juror_id: int, discussion_id: int, before_msg_id: int) -> Optional[JurorResultDB]:
+    """The juror's latest result for messages before before_msg_id."""
+    return db.execute(_juror_result_before_query(juror_id, discussion_id, before_msg_id)).scalars().first()
+
+# Async variants, for sessions from AsyncSessionLocal
+async def aget_jurors(db, discussion_id: int) -> List[JurorDB]:
+    result = await db.execute(select(JurorDB).filter(JurorDB.discussion_id == discussion_id))
+    return list(result.scalars().all())
+
+async def acreate_juror_result(db, juror_id: int, discussion_id: int, latest_msg_id: int, result: str, reasoning: str, carried_forward: bool = False):
+    new_message = JurorResultDB(
+        juror_id=juror_id,
+        discussion_id=discussion_id,
+        latest_msg_id=latest_msg_id,
+        result=result,
+        reasoning=reasoning,
+        carried_forward=carried_forward,
+        created_at=datetime.utcnow()
+    )
+    db.add(new_message)
+    await db.flush()
+    # Same transaction as the history row, so the two never disagree
+    await db.execute(_upsert_juror_state(new_message))
+    await db.commit()
+    await db.refresh(new_message)
+    return new_message
+
+async def aget_juror_result(db, juror_id: int, discussion_id: int) -> List[JurorResultDB]:
+    result = await db.execute(
+        select(JurorResultDB)
+        .filter(JurorResultDB.juror_id == juror_id)
+        .filter(JurorResultDB.discussion_id == discussion_id)
+        .order_by(JurorResultDB.created_at.asc())
+    )
+    return list(result.scalars().all())
+
+async def aget_all_juror_results(db, discussion_id: int) -> List[List[JurorResultDB]]:
+    result = await db.execute(_juror_history_query(discussion_id))
+    return _group_by_juror(result.scalars().all())
+
+async def aget_juror_states(db, discussion_id: int) -> Dict[int, JurorStateDB]:
+    result = await db.execute(
+        select(JurorStateDB)
+        .filter(JurorStateDB.discussion_id == discussion_id)
+        .execution_options(populate_existing=True)
+    )
+    return {state.juror_id: state for state in result.scalars().all()}
+
+async def aget_juror_result_before(db, juror_id: int, discussion_id: int, before_msg_id: int) -> Optional[JurorResultDB]:
+    result = await db.execute(_juror_result_before_query(juror_id, discussion_id, before_msg_id))
+    return result.scalars().first()
+
+async def amark_juror_results_sent(db, discussion_id: int, responses: Dict[int, dict]):
+    """Record the results just broadcast to clients as the juror_delta baseline."""
+    if not responses:
+        return
+    await db.execute(update(JurorStateDB), [
+        {
+            "discussion_id": discussion_id,
+            "juror_id": juror_id,
+            "sent_result": response["result"],
+            "sent_reasoning": response["reasoning"],
+        }
+        for juror_id, response in responses.items()
+    ])
+    await db.commit()
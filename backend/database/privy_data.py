@@ -1,12 +1,7 @@
-import os
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import create_engine, Column, Integer, String, DateTime
-from sqlalchemy.ext.declarative import declarative_base
-
-DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL)
-Base = declarative_base()
+from sqlalchemy import Column, Integer, String, DateTime, select
+from . import Base
 
 class PrivyWalletDB(Base):
     __tablename__ = "privy_wallets"
@@ -35,4 +30,8 @@ def get_privy_wallet(db, debate_id: int) -> Optional[PrivyWalletDB]:
         .filter(PrivyWalletDB.debate_id == debate_id)\
         .first()
 
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+
+# Async variants, for sessions from AsyncSessionLocal
+async def aget_privy_wallet(db, debate_id: int) -> Optional[PrivyWalletDB]:
+    result = await db.execute(select(PrivyWalletDB).filter(PrivyWalletDB.debate_id == debate_id))
+    return result.scalars().first()
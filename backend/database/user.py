@@ -2,7 +2,7 @@ from datetime import datetime
 from typing import List
 from sqlalchemy import Column, Integer, String, DateTime, text
 from sqlalchemy.exc import IntegrityError
-from . import Base, engine
+from . import Base
 
 # User model
 class UserDB(Base):
@@ -50,6 +50,3 @@ def get_user(db, user_address: str) -> UserDB:
     return db.query(UserDB)\
         .filter(UserDB.user_address == user_address)\
         .first()
-
-# 创建不存在的表
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
@@ -3,9 +3,11 @@ load_dotenv()
 
 import os
 import logging
-from typing import List, Dict
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, BackgroundTasks
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, BackgroundTasks, Header
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import TypeAdapter
 import dspy
 import asyncio
 from httpx import AsyncClient
@@ -13,16 +15,26 @@ import datetime
 import json
 
 # custom modules
-from backend.database import SessionLocal, Base, engine
+from backend.database import SessionLocal, AsyncSessionLocal, init_db, DB_CREATE_TABLES
 from backend.data_structure import ChatMessage, User, Debate, Side, GeneratePersonasRequest, PrivyWalletRequest
-from backend.database.chat_message import create_chat_message, get_chat_history, ChatMessageDB
+from backend.database.chat_message import create_chat_message, get_chat_history, get_chat_messages_after, get_chat_messages_before, ChatMessageDB, acreate_chat_message, aget_chat_history, aget_chat_messages_after
 from backend.database.user import create_user, get_user
-from backend.database.juror import create_juror, get_jurors, get_juror_result, get_all_juror_results, create_juror_result
-from backend.database.debate import create_debate, get_debate, DebateDB, update_debate_status
-from backend.agents.juror import Juror
-from backend.agents.utils import generate_juror_persona, summarize_debate
+from backend.database.juror import create_juror, get_jurors, get_all_juror_results, get_juror_states, aget_jurors, aget_juror_states, aget_juror_result_before, acreate_juror_result, amark_juror_results_sent
+from backend.database.debate import create_debate, get_debate, DebateDB, aget_debate, aend_debate_if_full
+from backend.agents.juror import Juror, Jury
+from backend.agents.juror_engine import juror_engine, JUROR_STREAM_REASONING
+from backend.agents.juror_cache import juror_cache
+from backend.agents.context import conversation_contexts
+from backend.agents.juror_scheduler import JurorRoundScheduler
+from backend.agents.relevance import relevance_filter, RELEVANCE_FILTER_ENABLED
+from backend.agents.utils import generate_juror_persona, asummarize_debate
+from backend.agents.llm_scheduler import ScheduledLM, Priority, llm_request, llm_scheduler
+from backend.agents.registry import modules, DSPY_WARMUP
 from backend.debate_manager.debate_manager import DebateManager
-from backend.database.privy_data import create_privy_wallet, get_privy_wallet
+from backend.database.privy_data import create_privy_wallet, get_privy_wallet, aget_privy_wallet
+from backend.realtime.connection_manager import ConnectionManager
+from backend.realtime.pubsub import create_broadcast_backend
+from backend.realtime.juror_delta import juror_deltas, tally, JUROR_BROADCAST_MODE, JUROR_BROADCAST_MODES
 
 # Constants
 JUDGE_API_URL = os.getenv("JUDGE_API_URL")
@@ -37,14 +49,33 @@ if not FRONTEND_BASE_URL:
 
 logger = logging.getLogger()
 
+JUROR_MODES = ("individual", "batched")
+
+# Validates post_message frames received over the WebSocket like FastAPI validates POST /msg bodies
+chat_message_adapter = TypeAdapter(ChatMessage)
+if JUROR_BROADCAST_MODE not in JUROR_BROADCAST_MODES:
+    raise ValueError(f"JUROR_BROADCAST_MODE must be one of {JUROR_BROADCAST_MODES}")
+
+# Broadcast batching window used while a debate's end-of-debate results are being published
+DEBATE_END_BATCH_WINDOW_MS = float(os.getenv("DEBATE_END_BATCH_WINDOW_MS", "50"))
+
+# Page size for GET /msg/{id} when a cursor is given without ?limit=, and the largest allowed
+MSG_PAGE_DEFAULT_LIMIT = int(os.getenv("MSG_PAGE_DEFAULT_LIMIT", "50"))
+MSG_PAGE_MAX_LIMIT = int(os.getenv("MSG_PAGE_MAX_LIMIT", "200"))
+
 # Create singleton DebateManager instance
 debate_manager = DebateManager(debate_id=None, api_url=JUDGE_API_URL)
 
 # dspy
 model = os.getenv("MODEL")
-lm = dspy.LM(model=model, api_key=os.getenv("OPENAI_API_KEY"), api_base=os.getenv("OPENAI_BASE_URL"))
+lm = ScheduledLM(model=model, api_key=os.getenv("OPENAI_API_KEY"), api_base=os.getenv("OPENAI_BASE_URL"))
 dspy.configure(lm=lm)
 
+# Cheap model answering first for debates in juror cascade mode
+fast_model = os.getenv("FAST_MODEL")
+if fast_model:
+    juror_engine.fast_lm = ScheduledLM(model=fast_model, api_key=os.getenv("OPENAI_API_KEY"), api_base=os.getenv("OPENAI_BASE_URL"))
+
 # fastapi app
 app = FastAPI()
 
@@ -56,33 +87,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Store connected WebSocket clients
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, Dict[str, WebSocket]] = {}  # debate_id -> {client_id: websocket}
-
-    async def connect(self, websocket: WebSocket, debate_id: str, client_id: str):
-        await websocket.accept()
-        if debate_id not in self.active_connections:
-            self.active_connections[debate_id] = {}
-        self.active_connections[debate_id][client_id] = websocket
-
-    def disconnect(self, debate_id: str, client_id: str):
-        if debate_id in self.active_connections:
-            self.active_connections[debate_id].pop(client_id, None)
-            if not self.active_connections[debate_id]:
-                self.active_connections.pop(debate_id, None)
-
-    async def broadcast_message(self, debate_id: str, message: dict):
-        if debate_id in self.active_connections:
-            for connection in self.active_connections[debate_id].values():
-                try:
-                    await connection.send_json(message)
-                except:
-                    # Handle failed connections
-                    continue
-
-manager = ConnectionManager()
+manager = ConnectionManager(backend=create_broadcast_backend())
 
 
 def wrap_message(message: ChatMessageDB):
@@ -99,102 +104,264 @@ def wrap_message(message: ChatMessageDB):
         }
     }
 
+@app.on_event("startup")
+async def startup():
+    if DB_CREATE_TABLES:
+        init_db()
+    # Build every dspy predictor once, up front, instead of on the first request
+    modules.build_all()
+    await manager.start()
+    if DSPY_WARMUP:
+        await modules.warm_up()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await manager.stop()
+
 @app.get("/")
 def read_root():
     return {"message": "Hello, World!"}
 
-async def judge_with_juror(juror, topic, sides, conv_history, past_reasoning, previous_decision, new_message):
-    """Helper function to run a single juror's judgment"""
-    # Convert the synchronous judge method result into an awaitable
-    result, reasoning = juror.judge(topic=topic, sides=sides, conv_history=conv_history, 
-                                  past_reasoning=past_reasoning, previous_decision=previous_decision, 
-                                  new_message=new_message)
-    return result, reasoning
+async def run_juror_round(discussion_id: int, message_id: int, first_message_id: int = None, on_commit=None,
+                          prefilter: bool = False, on_partial=None, on_done=None) -> dict:
+    """Judge messages first_message_id..message_id with every juror of the debate and store the results.
 
-async def process_juror_responses(db, message_id: int, discussion_id: int):
-    try:
-        debate_info = get_debate(db, discussion_id)
-        past_messages = get_chat_history(db, discussion_id)
-        jurors = get_jurors(db, discussion_id)
-        
-        conv_history = ""
-        for msg in past_messages[:-1]:
-            conv_history += f"{msg.username}: {msg.message}\n"
-        
-        new_message = f"{past_messages[-1].username}: {past_messages[-1].message}"
-        
-        sides = []
-        for idx, side in enumerate(debate_info.sides):
-            sides.append(Side(id=str(idx), description=side))
-        
-        # Create list of judgment tasks
-        judgment_tasks = []
+    Inputs are read and results written in short sessions of their own, so
+    no pooled connection is held while the jurors run.
+    on_commit, if given, is called right before the results are written.
+    With prefilter, a round whose messages are all irrelevant carries every
+    juror's previous result forward without calling the LLM.
+    on_partial(juror_id, chunk) and on_done(juror_id, result, reasoning) are
+    awaited as each juror's reasoning streams in and as each juror finishes.
+    """
+    if first_message_id is None:
+        first_message_id = message_id
+    async with AsyncSessionLocal() as db:
+        debate_info = await aget_debate(db, discussion_id)
+        jurors = await aget_jurors(db, discussion_id)
+
+        past_decisions = {}
+        juror_states = await aget_juror_states(db, discussion_id)
         for juror_db in jurors:
-            juror = Juror(persona=juror_db.persona)
-            past_reasoning_list = get_juror_result(db, juror_db.juror_id, discussion_id)
-            past_reasoning = past_reasoning_list[-1].reasoning if past_reasoning_list else ""
-            previous_decision = past_reasoning_list[-1].result if past_reasoning_list else -1
-            
-            # Create coroutine for each juror
-            task = judge_with_juror(
-                juror=juror,
-                topic=debate_info.topic,
-                sides=sides,
-                conv_history=conv_history,
-                past_reasoning=past_reasoning,
-                previous_decision=previous_decision,
-                new_message=new_message
-            )
-            judgment_tasks.append((juror_db.juror_id, task))
-        
+            # Only decisions made before these messages, so re-judging a message sees the same inputs
+            past = juror_states.get(juror_db.juror_id)
+            if past is not None and past.latest_msg_id >= first_message_id:
+                past = await aget_juror_result_before(db, juror_db.juror_id, discussion_id, first_message_id)
+            past_reasoning = past.reasoning if past is not None else ""
+            previous_decision = past.result if past is not None else -1
+            past_decisions[juror_db.juror_id] = (past_reasoning, previous_decision)
+
+        round_messages = []
+        if prefilter and RELEVANCE_FILTER_ENABLED:
+            round_messages = await aget_chat_messages_after(db, discussion_id, first_message_id - 1, upto_id=message_id)
+
+    # Rolling summary + recent messages, advanced by the messages since the last round
+    conv_history, new_message = await conversation_contexts.build(discussion_id, message_id, first_message_id)
+
+    sides = []
+    for idx, side in enumerate(debate_info.sides):
+        sides.append(Side(id=str(idx), description=side))
+
+    skip_reason = None
+    if round_messages:
+        checks = [
+            relevance_filter.check(discussion_id, msg.id, debate_info.topic, debate_info.sides, msg.message)
+            for msg in round_messages
+        ]
+        if not any(is_relevant for is_relevant, _ in checks):
+            skip_reason = ",".join(sorted({reason for _, reason in checks}))
+
+    if skip_reason is not None:
+        # Nothing here can change a juror's mind: keep each juror's previous decision
+        logger.info(f"Skipping juror round for messages {first_message_id}-{message_id} in debate {discussion_id}: {skip_reason}")
+        judgment_results = {
+            juror_id: (previous_decision, past_reasoning)
+            for juror_id, (past_reasoning, previous_decision) in past_decisions.items()
+            if previous_decision != -1
+        }
+        if on_done is not None:
+            for juror_id, (result, reasoning) in judgment_results.items():
+                await on_done(juror_id, result, reasoning)
+    elif debate_info.juror_mode == "batched":
+        # One LLM call for the whole panel
+        jury = Jury(personas={juror_db.juror_id: juror_db.persona for juror_db in jurors})
+        judgment_results = await juror_engine.judge_panel(
+            str(discussion_id),
+            jury,
+            topic=debate_info.topic,
+            sides=sides,
+            conv_history=conv_history,
+            past_decisions=past_decisions,
+            new_message=new_message,
+            on_done=on_done
+        )
+    else:
+        # Build one judgment request per juror
+        judgment_requests = {}
+        for juror_db in jurors:
+            past_reasoning, previous_decision = past_decisions[juror_db.juror_id]
+            judgment_requests[juror_db.juror_id] = (Juror(persona=juror_db.persona), {
+                "topic": debate_info.topic,
+                "sides": sides,
+                "conv_history": conv_history,
+                "past_reasoning": past_reasoning,
+                "previous_decision": previous_decision,
+                "new_message": new_message
+            })
+
         # Execute all judgments concurrently
-        results = {}
-        tasks = [task for _, task in judgment_tasks]
-        judgment_results = await asyncio.gather(*tasks)
-        
-        # Process results and save to database
-        for (juror_id, _), (result, reasoning) in zip(judgment_tasks, judgment_results):
+        judgment_results = await juror_engine.judge_all(
+            str(discussion_id),
+            judgment_requests,
+            on_partial=on_partial,
+            on_done=on_done,
+            cascade=bool(debate_info.juror_cascade)
+        )
+
+    if on_commit is not None:
+        on_commit()
+
+    # Process results and save to database
+    results = {}
+    async with AsyncSessionLocal() as db:
+        for juror_id, (result, reasoning) in judgment_results.items():
             results[juror_id] = {
                 "result": result,
-                "reasoning": reasoning
+                "reasoning": reasoning,
+                "carried_forward": skip_reason is not None
             }
-            create_juror_result(
+            await acreate_juror_result(
                 db=db,
                 discussion_id=discussion_id,
                 latest_msg_id=message_id,
                 juror_id=juror_id,
                 result=result,
-                reasoning=reasoning
+                reasoning=reasoning,
+                carried_forward=skip_reason is not None
             )
-                
-        db.commit()
 
-        # Prepare juror response data for broadcast
-        response_data = {
-            "type": "juror_response",
+        await db.commit()
+    return results
+
+async def process_juror_responses(discussion_id: int, first_message_id: int, last_message_id: int, on_commit=None):
+    debate_id = str(discussion_id)
+
+    async def on_partial(juror_id, chunk: str):
+        await manager.broadcast_message(debate_id, {
+            "type": "juror_response_partial",
             "data": {
-                "message_id": message_id,
-                "responses": results
+                "message_id": last_message_id,
+                "first_message_id": first_message_id,
+                "last_message_id": last_message_id,
+                "juror_id": juror_id,
+                "chunk": chunk
             }
+        }, ephemeral=True)
+
+    # What clients were last sent for each juror, shared by every worker
+    async with AsyncSessionLocal() as db:
+        juror_states = await aget_juror_states(db, discussion_id)
+    if any(state.latest_msg_id >= last_message_id for state in juror_states.values()):
+        # A round on another worker already judged a later message, with these ones in its context
+        logger.info(f"Skipping juror round for messages {first_message_id}-{last_message_id} in debate {discussion_id}: already judged")
+        return
+    baseline = juror_deltas.baseline(juror_states)
+
+    async def on_done(juror_id, result, reasoning: str):
+        data = {
+            "message_id": last_message_id,
+            "first_message_id": first_message_id,
+            "last_message_id": last_message_id,
+            "juror_id": juror_id,
+            "result": result,
+            "reasoning": reasoning
         }
-        
-        # Broadcast the juror responses
-        await manager.broadcast_message(str(discussion_id), response_data)
-        
+        if JUROR_BROADCAST_MODE == "delta" and not juror_deltas.is_changed(baseline.get(juror_id), data):
+            # Clients already hold this juror's reasoning
+            del data["reasoning"]
+            data["unchanged"] = True
+        await manager.broadcast_message(debate_id, {"type": "juror_response_done", "data": data})
+
+    try:
+        results = await run_juror_round(
+            discussion_id,
+            last_message_id,
+            first_message_id,
+            on_commit,
+            prefilter=True,
+            on_partial=on_partial if JUROR_STREAM_REASONING else None,
+            on_done=on_done
+        )
+
+        async with AsyncSessionLocal() as db:
+            # Prepare juror response data for broadcast
+            if JUROR_BROADCAST_MODE == "delta":
+                # Only jurors that changed side or meaningfully changed reasoning; the full state is at /juror_results/{id}/latest
+                debate_info = await aget_debate(db, discussion_id)
+                changed = juror_deltas.diff(baseline, results)
+                # Every juror's latest result, including jurors that timed out this round
+                latest = {juror_id: {"result": state.result} for juror_id, state in (await aget_juror_states(db, discussion_id)).items()}
+                response_data = {
+                    "type": "juror_delta",
+                    "data": {
+                        "message_id": last_message_id,
+                        "first_message_id": first_message_id,
+                        "last_message_id": last_message_id,
+                        "changed": changed,
+                        "unchanged": [juror_id for juror_id in results if juror_id not in changed],
+                        "tally": tally(latest, len(debate_info.sides))
+                    }
+                }
+            else:
+                changed = results
+                response_data = {
+                    "type": "juror_response",
+                    "data": {
+                        "message_id": last_message_id,
+                        "first_message_id": first_message_id,
+                        "last_message_id": last_message_id,
+                        "responses": results
+                    }
+                }
+
+            # Broadcast the juror responses
+            await manager.broadcast_message(str(discussion_id), response_data)
+            await amark_juror_results_sent(db, discussion_id, changed)
+
     except Exception as e:
         logger.error(f"Error processing juror responses: {str(e)}")
-        db.rollback()
 
-@app.post("/msg")
-async def post_msg(request: ChatMessage, background_tasks: BackgroundTasks):
-    db = SessionLocal()
-    try:
-        logger.info(f"Received message request: {request}")
-        debate = get_debate(db, request.discussion_id)
-        if debate.is_ended:
-            raise HTTPException(status_code=400, detail="Debate has ended")
-        
-        new_message = create_chat_message(
+async def announce_cancelled_round(discussion_id: int, first_message_id: int, last_message_id: int):
+    # Clients drop the verdicts and reasoning this round already streamed; its results are never stored
+    await manager.broadcast_message(str(discussion_id), {
+        "type": "juror_round_cancelled",
+        "data": {
+            "first_message_id": first_message_id,
+            "last_message_id": last_message_id
+        }
+    })
+
+juror_rounds = JurorRoundScheduler(run_round=process_juror_responses, on_cancel=announce_cancelled_round, lock=manager.backend.lock)
+
+async def submit_chat_message(db, request: ChatMessage, run_in_background) -> ChatMessageDB:
+    """Validate, store and broadcast a chat message; shared by POST /msg and WebSocket post_message frames.
+
+    Args:
+        db: Session to write with; the caller closes it.
+        request: The message to post.
+        run_in_background: Called as run_in_background(fn, **kwargs) to schedule the debate-end processing.
+
+    Returns:
+        The stored message.
+    """
+    logger.info(f"Received message request: {request}")
+    debate = await aget_debate(db, request.discussion_id)
+    if debate is None:
+        raise HTTPException(status_code=404, detail="Debate not found")
+    if debate.is_ended:
+        raise HTTPException(status_code=400, detail="Debate has ended")
+
+    new_message = await acreate_chat_message(
             db=db,
             discussion_id=request.discussion_id,
             user_address=request.user_address,
@@ -202,52 +369,55 @@ async def post_msg(request: ChatMessage, background_tasks: BackgroundTasks):
             message=request.message,
             stance=request.stance
         )
-        db.commit()
-        
-        # Immediately broadcast the message
-        await manager.broadcast_message(str(request.discussion_id), wrap_message(new_message))
-        
-        # Process juror responses in the background
-        background_tasks.add_task(
-            process_juror_responses,
-            db=SessionLocal(),  # Create a new db session for background task
-            message_id=new_message.id,
-            discussion_id=request.discussion_id
+    await db.commit()
+
+    # Immediately broadcast the message
+    await manager.broadcast_message(str(request.discussion_id), wrap_message(new_message))
+
+    # Process juror responses in the background, coalesced with other messages of this burst
+    juror_rounds.submit(request.discussion_id, new_message.id)
+
+    # Check message count and process debate if needed; only the post that crosses the limit ends it
+    MAX_MESSAGES = 5 + 1
+    if await aend_debate_if_full(db, request.discussion_id, MAX_MESSAGES):
+        logger.info(f"Debate {request.discussion_id} has reached {MAX_MESSAGES-1} messages, processing results...")
+        # Process debate results in background
+        run_in_background(
+            process_debate_end,
+            debate_id=str(request.discussion_id)
         )
-        
-        # Check message count and process debate if needed
-        chat_history = get_chat_history(db, request.discussion_id)
-        message_count = len(chat_history)
-        MAX_MESSAGES = 5 + 1
-        if message_count >= MAX_MESSAGES:
-            logger.info(f"Debate {request.discussion_id} has reached {MAX_MESSAGES-1} messages, processing results...")
-            update_debate_status(db=db, discussion_id=request.discussion_id, is_ended=True)
-            # Process debate results in background
-            background_tasks.add_task(
-                process_debate_end,
-                debate_id=str(request.discussion_id)
-            )
-            
-            # Prepare debate end notification
-            end_message = create_chat_message(
-                db=db,
-                discussion_id=request.discussion_id,
-                user_address=chat_history[0].user_address,
-                username=chat_history[0].username,
-                message=f"Debate has reached {MAX_MESSAGES-1} messages and will now be processed for final results.",
-                stance=None
-            )
-            
-            db.commit()
-            await manager.broadcast_message(str(request.discussion_id), wrap_message(end_message))
-        
+
+        # Prepare debate end notification
+        first_message = (await aget_chat_messages_after(db, request.discussion_id, 0, limit=1))[0]
+        end_message = await acreate_chat_message(
+            db=db,
+            discussion_id=request.discussion_id,
+            user_address=first_message.user_address,
+            username=first_message.username,
+            message=f"Debate has reached {MAX_MESSAGES-1} messages and will now be processed for final results.",
+            stance=None
+        )
+
+        await db.commit()
+        await manager.broadcast_message(str(request.discussion_id), wrap_message(end_message))
+
+    return new_message
+
+@app.post("/msg")
+async def post_msg(request: ChatMessage, background_tasks: BackgroundTasks):
+    db = AsyncSessionLocal()
+    try:
+        new_message = await submit_chat_message(db, request, background_tasks.add_task)
         return {"message_id": new_message.id, "status": "success"}
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error creating message: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error creating message: {str(e)}")
     finally:
-        db.close()
+        await db.close()
 
 # async def process_debate_end(debate_id: str):
 #     try:
@@ -308,45 +478,13 @@ async def post_msg(request: ChatMessage, background_tasks: BackgroundTasks):
 
 @app.post("/juror_response/{message_id}")
 async def get_juror_response(message_id: int, background_tasks: BackgroundTasks):
-    db = SessionLocal()
     try:
-        from backend.database.chat_message import ChatMessageDB
-        
-        message = db.query(ChatMessageDB).filter(ChatMessageDB.id == message_id).first()
+        async with AsyncSessionLocal() as db:
+            message = await db.get(ChatMessageDB, message_id)
         if not message:
             raise HTTPException(status_code=404, detail="Message not found")
-            
-        debate_info = get_debate(db, message.discussion_id)
-        past_messages = get_chat_history(db, message.discussion_id)
-        jurors = get_jurors(db, message.discussion_id)
-        
-        conv_history = ""
-        for msg in past_messages:
-            user = get_user(db, msg.user_address)
-            conv_history += f"{user.username}: {msg.message}\n"
-        
-        sides = []
-        for idx, side in enumerate(debate_info.sides):
-            sides.append(Side(id=str(idx), description=side))
-        
-        results = {}
-        for juror_db in jurors:
-            juror = Juror(persona=juror_db.persona)
-            result, reasoning = juror.judge(topic=debate_info.topic, sides=sides, conv_history=conv_history, previous_decision=message.stance)
-            results[juror_db.juror_id] = {
-                "result": result,
-                "reasoning": reasoning
-            }
-            create_juror_result(
-                db=db, 
-                discussion_id=message.discussion_id, 
-                latest_msg_id=message_id, 
-                juror_id=juror_db.juror_id, 
-                result=result,
-                reasoning=reasoning
-            )
-                
-        db.commit()
+
+        results = await run_juror_round(message.discussion_id, message_id)
 
         # Prepare response data for broadcast
         response_data = {
@@ -363,23 +501,41 @@ async def get_juror_response(message_id: int, background_tasks: BackgroundTasks)
             str(message.discussion_id),
             response_data
         )
+        # Clients now hold these results; later juror_delta events compare against them
+        async with AsyncSessionLocal() as db:
+            await amark_juror_results_sent(db, message.discussion_id, results)
         
         return results
     except Exception as e:
-        db.rollback()
         logger.error(f"Error getting juror response: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting juror response: {str(e)}")
-    finally:
-        db.close()
 
 @app.get("/msg/{discussion_id}", response_model=List[ChatMessage])
-def get_msg(discussion_id: int):
+def get_msg(discussion_id: int, before_id: Optional[int] = None, after_id: Optional[int] = None, limit: Optional[int] = None):
+    """Chat messages of a debate, oldest first.
+
+    Without parameters, the whole history (kept for older clients).
+    ?limit=N: the newest page; ?before_id=X: the page before message X, for
+    scrolling back; ?after_id=X: messages newer than X, for polling or
+    catching up after a reconnect. Pages hold at most `limit` messages; a
+    shorter page means there is nothing further in that direction.
+    """
+    if before_id is not None and after_id is not None:
+        raise HTTPException(status_code=400, detail="Use either before_id or after_id, not both")
+    if limit is not None and not 1 <= limit <= MSG_PAGE_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MSG_PAGE_MAX_LIMIT}")
     db = SessionLocal()
     try:
-        response = get_chat_history(db, discussion_id)
+        if after_id is not None:
+            response = get_chat_messages_after(db, discussion_id, after_id, limit=limit or MSG_PAGE_DEFAULT_LIMIT)
+        elif before_id is not None or limit is not None:
+            response = get_chat_messages_before(db, discussion_id, before_id, limit or MSG_PAGE_DEFAULT_LIMIT)
+        else:
+            response = get_chat_history(db, discussion_id)
         messages = []
         for res in response:
             messages.append(ChatMessage(
+                id=res.id,
                 discussion_id=res.discussion_id,
                 username=res.username,
                 user_address=res.user_address,
@@ -426,6 +582,11 @@ def get_user_info(user_address: str):
 
 @app.post("/debate")
 def post_debate(request: Debate):
+    if request.juror_mode not in JUROR_MODES:
+        raise HTTPException(status_code=400, detail=f"juror_mode must be one of {JUROR_MODES}")
+    if request.juror_cascade and juror_engine.fast_lm is None:
+        logger.warning("juror_cascade requested but FAST_MODEL is not set, jurors will use MODEL only")
+
     db = SessionLocal()
     try:
         # Generate new discussion_id
@@ -469,7 +630,9 @@ def post_debate(request: Debate):
                 juror_ids=juror_ids,
                 funding=request.funding,
                 action=request.action,
-                creator_address=request.creator_address
+                creator_address=request.creator_address,
+                juror_mode=request.juror_mode,
+                juror_cascade=request.juror_cascade
             )
             db.commit()
             
@@ -491,6 +654,8 @@ def post_debate(request: Debate):
                 "action": new_debate.action,
                 "funding": new_debate.funding,
                 "jurors": request.jurors,
+                "juror_mode": new_debate.juror_mode,
+                "juror_cascade": new_debate.juror_cascade,
                 "creator_address": new_debate.creator_address,
                 "creator_username": request.creator_username,  # 添加创建者用户名
                 "created_at": new_debate.created_at.isoformat(),  # 添加创建时间
@@ -503,6 +668,9 @@ def post_debate(request: Debate):
 
             raise HTTPException(status_code=500, detail=f"Error creating debate: {str(e)}")
         
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         logger.error(f"Error in post_debate: {str(e)}")
@@ -544,42 +712,207 @@ def generate_personas(request: GeneratePersonasRequest):
     """Generate a list of diverse juror personas"""
     try:
         topic = request.topic
-        personas = generate_juror_persona(topic)
+        with llm_request(Priority.PERSONA):
+            personas = generate_juror_persona(topic)
         return {"personas": personas}
     except Exception as e:
         logger.error(f"Error generating personas: {str(e)}")
         raise HTTPException(status_code=500, detail="Error generating juror personas")
 
-@app.websocket("/ws/{debate_id}/{client_id}")
-async def websocket_endpoint(websocket: WebSocket, debate_id: str, client_id: str):
-    await manager.connect(websocket, debate_id, client_id)
+@app.get("/juror_results/{discussion_id}/latest")
+def return_latest_juror_results(discussion_id: int):
+    """Every juror's most recent result, in the same shape as a juror_response event."""
+    db = SessionLocal()
+    try:
+        responses = {}
+        message_id = None
+        for latest_result in get_juror_states(db, discussion_id).values():
+            responses[latest_result.juror_id] = {
+                "result": latest_result.result,
+                "reasoning": latest_result.reasoning,
+                "carried_forward": bool(latest_result.carried_forward)
+            }
+            message_id = max(message_id or 0, latest_result.latest_msg_id)
+        return {"message_id": message_id, "responses": responses}
+    except Exception as e:
+        logger.error(f"Error getting latest juror results: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving juror results: {str(e)}")
+    finally:
+        db.close()
+
+@app.get("/metrics")
+def get_metrics():
+    """Runtime counters for the juror pipeline and debate sockets."""
+    return {
+        "juror_cache": juror_cache.stats(),
+        "llm_scheduler": llm_scheduler.metrics(),
+        "juror_cascade": juror_engine.cascade_stats.to_dict(),
+        "websockets": manager.metrics()
+    }
+
+async def replay_from_database(debate_id: str, last_message_id: Optional[int]) -> List[dict]:
+    """Chat messages a reconnecting client missed, for when the replay buffer no longer covers it."""
+    if last_message_id is None:
+        return []
+    db = AsyncSessionLocal()
+    try:
+        return [wrap_message(message) for message in await aget_chat_messages_after(db, int(debate_id), last_message_id)]
+    except Exception as e:
+        logger.error(f"Error loading missed messages for debate {debate_id}: {str(e)}")
+        return []
+    finally:
+        await db.close()
+
+# The event loop only keeps weak references to tasks; hold them until they finish
+background_tasks_running = set()
+
+def run_task_in_background(fn, **kwargs):
+    task = asyncio.create_task(fn(**kwargs))
+    background_tasks_running.add(task)
+    task.add_done_callback(background_tasks_running.discard)
+
+async def handle_post_message_frame(connection, frame: dict):
+    """Post a chat message sent over the socket and ack it to the sender only.
+
+    Frame: {"type": "post_message", "request_id": ..., "debate_id": ..., "data": {"user_address", "message", "username", "stance"}}
+    debate_id is only needed on multiplexed sockets and must be one the socket is subscribed to.
+    """
+    request_id = frame.get("request_id")
+    debate_id = str(frame["debate_id"]) if frame.get("debate_id") is not None else connection.debate_id
+    if debate_id is None or debate_id not in connection.debates:
+        connection.send({"type": "error", "data": {"request_id": request_id, "detail": "Not subscribed to this debate"}})
+        return
+    db = AsyncSessionLocal()
+    try:
+        request = chat_message_adapter.validate_python({
+            **(frame.get("data") or {}),
+            "discussion_id": debate_id
+        })
+        new_message = await submit_chat_message(db, request, run_task_in_background)
+        connection.send({
+            "type": "ack",
+            "debate_id": debate_id,
+            "data": {"request_id": request_id, "message_id": new_message.id, "status": "success"}
+        })
+    except Exception as e:
+        await db.rollback()
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        logger.error(f"Error creating message over WebSocket: {detail}")
+        connection.send({"type": "error", "data": {"request_id": request_id, "detail": detail}})
+    finally:
+        await db.close()
+
+async def handle_subscription_frame(connection, frame: dict):
+    """Subscribe/unsubscribe a multiplexed socket to a debate.
+
+    Frames: {"type": "subscribe", "debate_id": ..., "last_seq": ..., "last_message_id": ...}
+            {"type": "unsubscribe", "debate_id": ...}
+    """
+    if frame.get("debate_id") is None:
+        connection.send({"type": "error", "data": {"detail": "debate_id is required"}})
+        return
+    debate_id = str(frame["debate_id"])
+    if frame["type"] == "unsubscribe":
+        manager.unsubscribe(connection, debate_id)
+        connection.send({"type": "unsubscribed", "debate_id": debate_id})
+        return
+    last_message_id = frame.get("last_message_id")
+    try:
+        await manager.subscribe(
+            connection,
+            debate_id,
+            last_seq=frame.get("last_seq"),
+            resync=lambda: replay_from_database(debate_id, last_message_id)
+        )
+    except ValueError as e:
+        connection.send({"type": "error", "debate_id": debate_id, "data": {"detail": str(e)}})
+
+async def serve_connection(connection, multiplexed: bool = False):
+    """Read frames from a debate socket until it disconnects."""
     try:
         while True:
-            # Keep the connection alive
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        manager.disconnect(debate_id, client_id)
+            # Any frame, pong included, proves the client is still there
+            text = await connection.websocket.receive_text()
+            connection.touch()
+            try:
+                frame = json.loads(text)
+            except ValueError:
+                continue
+            if not isinstance(frame, dict):
+                continue
+            if frame.get("type") == "post_message":
+                await handle_post_message_frame(connection, frame)
+            elif multiplexed and frame.get("type") in ("subscribe", "unsubscribe"):
+                await handle_subscription_frame(connection, frame)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        await connection.close()
+
+# Declared before /ws/{debate_id}/{client_id} so "multi" is not taken for a debate id
+@app.websocket("/ws/multi/{client_id}")
+async def multiplexed_websocket_endpoint(websocket: WebSocket, client_id: str):
+    """One socket following many debates; every event carries its debate_id."""
+    connection = await manager.connect(websocket, None, client_id)
+    await serve_connection(connection, multiplexed=True)
+
+@app.websocket("/ws/{debate_id}/{client_id}")
+async def websocket_endpoint(websocket: WebSocket, debate_id: str, client_id: str,
+                             last_seq: Optional[int] = None, last_message_id: Optional[int] = None):
+    connection = await manager.connect(
+        websocket,
+        debate_id,
+        client_id,
+        last_seq=last_seq,
+        resync=lambda: replay_from_database(debate_id, last_message_id)
+    )
+    await serve_connection(connection)
+
+@app.get("/debate/{debate_id}/events")
+async def debate_events(debate_id: str, last_event_id: Optional[str] = Header(None),
+                        last_seq: Optional[int] = None, last_message_id: Optional[int] = None):
+    """Read-only Server-Sent Events feed of a debate for spectators.
+
+    Carries the same events as the WebSocket, with each event's seq as its
+    SSE id, so a reconnecting EventSource resumes via Last-Event-ID.
+    `last_seq` does the same for clients that cannot set headers.
+    """
+    if last_event_id is not None and last_event_id.isdigit():
+        last_seq = int(last_event_id)
+    connection = await manager.open_event_stream(
+        debate_id,
+        "sse",
+        last_seq=last_seq,
+        resync=lambda: replay_from_database(debate_id, last_message_id)
+    )
+    return StreamingResponse(
+        connection.events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/debate/{debate_id}/funding_status")
 async def check_debate_funding_status(debate_id: str):
     """Check the funding status of a debate's wallets."""
-    db = SessionLocal()
     try:
-        # Get debate information
-        debate = get_debate(db, debate_id)
-        if not debate:
-            raise HTTPException(status_code=404, detail="Debate not found")
-            
+        # Closed before the balance lookups, which can take a while
+        async with AsyncSessionLocal() as db:
+            # Get debate information
+            debate = await aget_debate(db, int(debate_id))
+            if not debate:
+                raise HTTPException(status_code=404, detail="Debate not found")
+
+            # Get wallet information with proper session handling
+            wallet_info = await aget_privy_wallet(db, int(debate_id))
+            if not wallet_info:
+                raise HTTPException(status_code=404, detail="Wallet information not found")
+
         # Set debate_id for the singleton manager
         debate_manager.debate_id = debate_id
-        
-        # Get wallet information with proper session handling
-        wallet_info = get_privy_wallet(db, debate_id)
-        if not wallet_info:
-            raise HTTPException(status_code=404, detail="Wallet information not found")
             
         # Check CDP wallet funding
-        cdp_funded, cdp_balance = debate_manager.check_funding_status(
+        cdp_funded, cdp_balance = await asyncio.to_thread(
+            debate_manager.check_funding_status,
             wallet_info.cdp_wallet_address,  # Use the proper attribute access
             0.0001  # Required CDP gas amount
         )
@@ -588,7 +921,8 @@ async def check_debate_funding_status(debate_id: str):
         privy_funded = False
         privy_balance = 0
         if debate.funding > 0:
-            privy_funded, privy_balance = debate_manager.check_funding_status(
+            privy_funded, privy_balance = await asyncio.to_thread(
+                debate_manager.check_funding_status,
                 wallet_info.privy_wallet_address,  # Use the proper attribute access
                 float(debate.funding)
             )
@@ -612,32 +946,45 @@ async def check_debate_funding_status(debate_id: str):
     except Exception as e:
         logger.error(f"Error checking funding status: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error checking funding status: {str(e)}")
-    finally:
-        db.close()  # Always close the session
 
 # @app.post("/debate/{debate_id}/process_result")
 async def process_debate_end(debate_id: str):
     """Process the debate result and execute necessary actions based on voting outcome."""
-    db = SessionLocal()
+    discussion_id = int(debate_id)
+    # The summary, deploy and per-participant mint messages come in bursts; send each burst as one frame
+    manager.set_batch_window(debate_id, DEBATE_END_BATCH_WINDOW_MS)
     try:
-        # Get debate information
-        debate = get_debate(db, debate_id)
-        if not debate:
-            raise HTTPException(status_code=404, detail="Debate not found")
-            
+        # The final messages' juror round is still debounced or running; its votes have to count
+        await juror_rounds.drain(debate_id)
+        # A round another worker is still running counts too; later ones see the debate already judged
+        async with juror_rounds.lock(debate_id):
+            pass
+
+        async with AsyncSessionLocal() as db:
+            # Get debate information
+            debate = await aget_debate(db, discussion_id)
+            if not debate:
+                raise HTTPException(status_code=404, detail="Debate not found")
+
+            # Get each juror's latest result
+            juror_states = await aget_juror_states(db, discussion_id)
+            if not juror_states:
+                raise HTTPException(
+                    status_code=400, 
+                    detail="No juror results found. Ensure all jurors have voted."
+                )
+
+            # Get chat history
+            chat_history = await aget_chat_history(db, discussion_id)
+
+            # Get wallet information for the debate
+            wallet_info = await aget_privy_wallet(db, discussion_id)
+            if not wallet_info:
+                raise HTTPException(status_code=404, detail="Wallet information not found")
+
         # Set debate_id for the singleton manager
         debate_manager.debate_id = debate_id
-        
-        # Get all juror results
-        juror_results = get_all_juror_results(db, debate_id)
-        if not juror_results:
-            raise HTTPException(
-                status_code=400, 
-                detail="No juror results found. Ensure all jurors have voted."
-            )
-            
-        # Get chat history
-        chat_history = get_chat_history(db, debate_id)
+
         debate_history = "\n".join([
             f"{msg.username}: {msg.message}" 
             for msg in chat_history
@@ -646,51 +993,40 @@ async def process_debate_end(debate_id: str):
         # Prepare voting results
         ai_votes = {}
         ai_reasoning = {}
-        for juror_results_list in juror_results:
-            # Get the latest result for each juror
-            if juror_results_list:  # Check if there are any results for this juror
-                latest_result = juror_results_list[-1]  # Get the most recent result
-                if type(latest_result.result) != int:
-                    raise HTTPException(status_code=400, detail="Juror result is not an integer")
-                ai_votes[str(latest_result.juror_id)] = latest_result.result
-                ai_reasoning[str(latest_result.juror_id)] = latest_result.reasoning
-            
-        # Get wallet information for the debate
-        wallet_info = get_privy_wallet(db, debate_id)
-        if not wallet_info:
-            raise HTTPException(status_code=404, detail="Wallet information not found")
+        for latest_result in juror_states.values():
+            if type(latest_result.result) != int:
+                raise HTTPException(status_code=400, detail="Juror result is not an integer")
+            ai_votes[str(latest_result.juror_id)] = latest_result.result
+            ai_reasoning[str(latest_result.juror_id)] = latest_result.reasoning
         
         judge_address = wallet_info.cdp_wallet_address  # Use proper attribute access
+
+        async def post_judge_message(message: str):
+            # A session per message, so no connection is held across the LLM and on-chain calls
+            async with AsyncSessionLocal() as db:
+                judge_message = await acreate_chat_message(
+                    db=db,
+                    discussion_id=discussion_id,
+                    user_address=judge_address,
+                    username="Judge Agent",
+                    message=message,
+                    stance=None
+                )
+            await manager.broadcast_message(debate_id, wrap_message(judge_message))
         
         # Create metadata URI for NFT
         metadata_uri = f"{FRONTEND_BASE_URL}/debate/{debate_id}"  # Base URL for debate metadata
         
         # 0. Summarize the debate
-        debate_summary = summarize_debate(debate.topic, debate.sides, debate_history)
-        judge_message = create_chat_message(
-            db=db,
-            discussion_id=debate_id,
-            user_address=judge_address,
-            username="Judge Agent",
-            message=f"🔍 Debate Summary:\n{debate_summary}",
-            stance=None
-        )
-        await manager.broadcast_message(debate_id, wrap_message(judge_message))
+        with llm_request(Priority.DEBATE_SUMMARY, debate_id):
+            debate_summary = await asummarize_debate(debate.topic, debate.sides, debate_history)
+        await post_judge_message(f"🔍 Debate Summary:\n{debate_summary}")
         
         try:
             # 1. Deploy NFT contract
             try:
-                contract_address, deploy_response = debate_manager.deploy_nft(metadata_uri)
-                judge_message = create_chat_message(
-                    db=db,
-                    discussion_id=debate_id,
-                    user_address=judge_address,
-                    username="Judge Agent",
-                    message=f"🔨 NFT Contract Deployed!\n{deploy_response}",
-                    stance=None
-                )
-                db.commit()
-                await manager.broadcast_message(debate_id, wrap_message(judge_message))
+                contract_address, deploy_response = await asyncio.to_thread(debate_manager.deploy_nft, metadata_uri)
+                await post_judge_message(f"🔨 NFT Contract Deployed!\n{deploy_response}")
                 
             except Exception as e:
                 error_msg = f"Failed to deploy NFT contract: {str(e)}"
@@ -724,7 +1060,7 @@ async def process_debate_end(debate_id: str):
                 mint_results = []
                 for participant_address in unique_participants:
                     try:
-                        mint_response = debate_manager.mint_nft(contract_address, participant_address)
+                        mint_response = await asyncio.to_thread(debate_manager.mint_nft, contract_address, participant_address)
                         mint_results.append({
                             "address": participant_address,
                             "response": mint_response,
@@ -735,15 +1071,7 @@ async def process_debate_end(debate_id: str):
                         # Broadcast individual minting success
                         creator_tag = " (Debate Creator)" if participant_address == debate.creator_address else ""
                         
-                        judge_message = create_chat_message(
-                            db=db,
-                            discussion_id=debate_id,
-                            user_address=judge_address,
-                            username="Judge Agent",
-                            message=f"🎨 NFT Minted Successfully to {participant_address}{creator_tag}!\n{mint_response}",
-                            stance=None
-                        )
-                        await manager.broadcast_message(debate_id, wrap_message(judge_message))
+                        await post_judge_message(f"🎨 NFT Minted Successfully to {participant_address}{creator_tag}!\n{mint_response}")
                     
                     except Exception as e:
                         mint_results.append({
@@ -778,15 +1106,7 @@ async def process_debate_end(debate_id: str):
                     f"Failed Mints: {len(unique_participants) - successful_mints}"
                 )
                 
-                judge_message = create_chat_message(
-                    db=db,
-                    discussion_id=debate_id,
-                    user_address=judge_address,
-                    username="Judge Agent",
-                    message=summary_message,
-                    stance=None
-                )
-                await manager.broadcast_message(debate_id, wrap_message(judge_message))
+                await post_judge_message(summary_message)
             except Exception as e:
                 error_msg = f"Failed to mint NFT: {str(e)}"
                 logger.error(error_msg)
@@ -824,19 +1144,12 @@ async def process_debate_end(debate_id: str):
 
             
             try:
-                action_result = debate_manager.execute_action(
+                action_result = await asyncio.to_thread(
+                    debate_manager.execute_action,
                     action_prompt=action_prompt,
                     privy_wallet_id=wallet_info.privy_wallet_id
                 )
-                judge_message = create_chat_message(
-                    db=db,
-                    discussion_id=debate_id,
-                    user_address=judge_address,
-                    username="Judge Agent",
-                    message=f"⚡ Action Result:\n{action_result}",
-                    stance=None
-                )
-                await manager.broadcast_message(debate_id, wrap_message(judge_message))
+                await post_judge_message(f"⚡ Action Result:\n{action_result}")
         
             except Exception as e:
                 error_msg = f"Failed to execute action: {str(e)}"
@@ -858,14 +1171,7 @@ async def process_debate_end(debate_id: str):
                 raise HTTPException(status_code=500, detail=f"Error executing action: {str(e)}")
             
             # Final summary message
-            judge_message = create_chat_message(
-                db=db,
-                discussion_id=debate_id,
-                user_address=judge_address,
-                username="Judge Agent",
-                message="✅ Debate processing completed!\n\n"
-            )
-            await manager.broadcast_message(debate_id, wrap_message(judge_message))
+            await post_judge_message("✅ Debate processing completed!\n\n")
             
             return {
                 "success": True,
@@ -921,7 +1227,13 @@ async def process_debate_end(debate_id: str):
         )
         raise HTTPException(status_code=500, detail=str(e))
     finally:
-        db.close()
+        manager.set_batch_window(debate_id, None)
+        await manager.flush(debate_id)
+        # No round may still be using the per-debate state below, or it would be re-created
+        await juror_rounds.drain(debate_id)
+        juror_engine.forget_debate(debate_id)
+        conversation_contexts.forget(debate_id)
+        relevance_filter.forget(debate_id)
 
 
 @app.post("/privy_wallet")
@@ -0,0 +1,382 @@
+import os
+import time
+import asyncio
+import logging
+import itertools
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi import WebSocket
+
+from backend.realtime.encoding import encode_message
+from backend.realtime.pubsub import BroadcastBackend, MemoryBroadcastBackend
+from backend.realtime.replay import ReplayBuffer
+
+logger = logging.getLogger(__name__)
+
+# Outbound frames buffered per connection before the overflow policy applies
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+# "drop_oldest": discard the oldest queued frame; "disconnect": close the slow consumer
+WS_OVERFLOW_POLICY = os.getenv("WS_OVERFLOW_POLICY", "drop_oldest")
+
+# Seconds between server pings; clients answer with a pong frame
+WS_HEARTBEAT_INTERVAL = float(os.getenv("WS_HEARTBEAT_INTERVAL", "20"))
+# Connections that have sent nothing (pong included) for this long are closed
+WS_IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT", "60"))
+
+# Events of one debate published within this many ms of each other go out as one "batch" frame (0: off)
+BROADCAST_BATCH_WINDOW_MS = float(os.getenv("BROADCAST_BATCH_WINDOW_MS", "0"))
+# A batch is flushed early once it holds this many events
+BROADCAST_BATCH_MAX_EVENTS = int(os.getenv("BROADCAST_BATCH_MAX_EVENTS", "100"))
+
+# Debates one multiplexed connection may be subscribed to at once
+WS_MAX_SUBSCRIPTIONS = int(os.getenv("WS_MAX_SUBSCRIPTIONS", "100"))
+
+OVERFLOW_POLICIES = ("drop_oldest", "disconnect")
+
+
+class ClientConnection:
+    """One WebSocket with its own bounded send queue and writer task.
+
+    Broadcasting only enqueues; the writer task does the actual sends, so a
+    slow or stalled client only ever delays itself. `debate_id` is the
+    debate a per-debate socket was opened for (None on a multiplexed
+    socket); `debates` holds every debate the socket is subscribed to.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, websocket: WebSocket, debate_id: Optional[str], client_id: str, manager: "ConnectionManager",
+                 max_queue: int = WS_SEND_QUEUE_SIZE, overflow_policy: str = WS_OVERFLOW_POLICY):
+        # client_id is not unique (e.g. every anonymous viewer), so each socket gets its own id
+        self.connection_id = f"{client_id}:{next(self._ids)}"
+        self.websocket = websocket
+        self.debate_id = debate_id
+        self.debates: Set[str] = set()
+        self.client_id = client_id
+        self.manager = manager
+        self.overflow_policy = overflow_policy
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.closed = False
+        self.writer: Optional[asyncio.Task] = None
+        self.last_seen = time.monotonic()
+
+    def start(self):
+        self.writer = asyncio.create_task(self._drain())
+
+    def send(self, message: dict) -> bool:
+        """Queue a message for this connection only (acks, errors)."""
+        return self.enqueue(encode_message(message))
+
+    def touch(self):
+        """Record that the client is still there (any frame received from it)."""
+        self.last_seen = time.monotonic()
+
+    def enqueue(self, frame: str, seq: Optional[int] = None) -> bool:
+        """Queue an encoded frame without waiting. Returns False if the connection is (now) closed."""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait((seq, frame))
+        except asyncio.QueueFull:
+            if self.overflow_policy == "disconnect":
+                logger.warning(f"Disconnecting slow client {self.connection_id}")
+                self.manager.close_later(self)
+                return False
+            self.queue.get_nowait()
+            self.queue.put_nowait((seq, frame))
+            self.dropped += 1
+        return True
+
+    def enqueue_replay(self, debate_id: str, frames: List[Tuple[Optional[int], str]], replay_complete: str,
+                       latest_seq: int):
+        """Queue the frames missed on a debate, then its replay_complete frame.
+
+        Sent as one `batch` frame so the overflow policy cannot split it; the
+        frames are already JSON, so the batch is assembled without re-encoding.
+        """
+        if frames:
+            data = ",".join(frame for _, frame in frames)
+            replay_complete = f'{{"type":"batch","debate_id":{encode_message(debate_id)},"data":[{data},{replay_complete}]}}'
+        self.enqueue(replay_complete)
+
+    async def _drain(self):
+        try:
+            while True:
+                _, frame = await self.queue.get()
+                await self.websocket.send_text(frame)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.info(f"Dropping dead connection {self.connection_id}: {str(e)}")
+            await self.close()
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.manager.evict(self)
+        if self.writer is not None and self.writer is not asyncio.current_task():
+            self.writer.cancel()
+        try:
+            await self.websocket.close()
+        except Exception:
+            # Already closed by the peer
+            pass
+
+
+class EventStreamConnection(ClientConnection):
+    """A read-only Server-Sent Events subscriber.
+
+    Shares the per-debate fan-out, replay and heartbeat with the sockets;
+    instead of a writer task, `events()` is the response body and yields
+    each queued frame as an SSE event whose id is the frame's seq.
+    """
+
+    def __init__(self, debate_id: str, client_id: str, manager: "ConnectionManager",
+                 max_queue: int = WS_SEND_QUEUE_SIZE, overflow_policy: str = WS_OVERFLOW_POLICY):
+        super().__init__(None, debate_id, client_id, manager, max_queue, overflow_policy)
+
+    def start(self):
+        pass
+
+    def enqueue_replay(self, debate_id: str, frames: List[Tuple[Optional[int], str]], replay_complete: str,
+                       latest_seq: int):
+        # Each frame keeps its own event id so Last-Event-ID resumes at the right place
+        for seq, frame in frames:
+            self.enqueue(frame, seq)
+        self.enqueue(replay_complete, latest_seq)
+
+    async def events(self) -> AsyncIterator[str]:
+        try:
+            yield "retry: 3000\n\n"
+            while not self.closed:
+                seq, frame = await self.queue.get()
+                if frame is None:
+                    break
+                # Nothing comes back on an event stream; a frame handed to the server counts as liveness
+                self.touch()
+                yield f"id: {seq}\ndata: {frame}\n\n" if seq is not None else f"data: {frame}\n\n"
+        finally:
+            await self.close()
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.manager.evict(self)
+        # Wake events() so the response ends
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait((None, None))
+
+
+class ConnectionManager:
+    """Sockets held by this worker, fed from the shared broadcast backend.
+
+    Broadcasts are published to the backend; every worker's manager receives
+    them through `deliver` and enqueues them for its own sockets.
+    """
+
+    def __init__(self, max_queue: int = WS_SEND_QUEUE_SIZE, overflow_policy: str = WS_OVERFLOW_POLICY,
+                 backend: Optional[BroadcastBackend] = None, heartbeat_interval: float = WS_HEARTBEAT_INTERVAL,
+                 idle_timeout: float = WS_IDLE_TIMEOUT, batch_window_ms: float = BROADCAST_BATCH_WINDOW_MS,
+                 batch_max_events: int = BROADCAST_BATCH_MAX_EVENTS):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"WS_OVERFLOW_POLICY must be one of {OVERFLOW_POLICIES}")
+        self.max_queue = max_queue
+        self.overflow_policy = overflow_policy
+        self.backend = backend if backend is not None else MemoryBroadcastBackend()
+        self.replay = ReplayBuffer()
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.reaped = 0
+        self._reaper: Optional[asyncio.Task] = None
+        self.batch_window_ms = batch_window_ms
+        self.batch_max_events = batch_max_events
+        self._batch_windows: Dict[str, float] = {}  # per-debate overrides of batch_window_ms
+        self._pending_batches: Dict[str, List[dict]] = {}
+        self._batch_flushers: Dict[str, asyncio.Task] = {}
+        self.active_connections: Dict[str, Dict[str, ClientConnection]] = {}  # debate_id -> {connection_id: connection}
+        self.connections: Dict[str, ClientConnection] = {}  # connection_id -> connection; its debates are connection.debates
+        # Closes started from synchronous code; the event loop only keeps weak references to tasks
+        self._closing: Set[asyncio.Task] = set()
+
+    async def start(self):
+        await self.backend.start(self.deliver)
+        if self.heartbeat_interval > 0:
+            self._reaper = asyncio.create_task(self._heartbeat())
+
+    async def stop(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        await self.backend.stop()
+
+    async def _heartbeat(self):
+        """Ping every socket and close the ones that have gone quiet for longer than idle_timeout."""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.reap_and_ping()
+            except Exception as e:
+                logger.error(f"Error in WebSocket heartbeat: {str(e)}")
+
+    async def reap_and_ping(self):
+        now = time.monotonic()
+        ping = encode_message({"type": "ping", "data": {"ts": time.time()}})
+        for connection in list(self.connections.values()):
+            if now - connection.last_seen > self.idle_timeout:
+                logger.info(f"Reaping idle connection {connection.connection_id}")
+                self.reaped += 1
+                await connection.close()
+            else:
+                connection.enqueue(ping)
+
+    def metrics(self) -> dict:
+        connections_by_debate = {
+            debate_id: len(connections) for debate_id, connections in self.active_connections.items()
+        }
+        return {
+            "connections": len(self.connections),
+            "connections_by_debate": connections_by_debate,
+            "reaped": self.reaped,
+            "dropped_frames": sum(connection.dropped for connection in self.connections.values())
+        }
+
+    async def connect(self, websocket: WebSocket, debate_id: Optional[str], client_id: str,
+                      last_seq: Optional[int] = None,
+                      resync: Optional[Callable[[], Awaitable[List[dict]]]] = None) -> ClientConnection:
+        """Accept and register a socket, subscribed to debate_id unless it is None (multiplexed)."""
+        await websocket.accept()
+        connection = ClientConnection(websocket, debate_id, client_id, self, self.max_queue, self.overflow_policy)
+        self.connections[connection.connection_id] = connection
+        if debate_id is not None:
+            await self.subscribe(connection, debate_id, last_seq, resync)
+        connection.start()
+        return connection
+
+    async def open_event_stream(self, debate_id: str, client_id: str, last_seq: Optional[int] = None,
+                                resync: Optional[Callable[[], Awaitable[List[dict]]]] = None) -> EventStreamConnection:
+        """Register a Server-Sent Events subscriber for one debate."""
+        connection = EventStreamConnection(debate_id, client_id, self, self.max_queue, self.overflow_policy)
+        self.connections[connection.connection_id] = connection
+        await self.subscribe(connection, debate_id, last_seq, resync)
+        return connection
+
+    async def subscribe(self, connection: ClientConnection, debate_id: str, last_seq: Optional[int] = None,
+                        resync: Optional[Callable[[], Awaitable[List[dict]]]] = None):
+        """Start delivering a debate's events to the connection, replaying what it missed since last_seq.
+
+        Missed frames come from the replay buffer; if it no longer covers
+        last_seq, `await resync()` supplies the messages to send instead,
+        followed by whatever was published while they were read (clients
+        drop messages they already hold by id). Either way the client then
+        gets a `replay_complete` frame with the seq to resume from.
+        """
+        if debate_id not in connection.debates and len(connection.debates) >= WS_MAX_SUBSCRIPTIONS:
+            raise ValueError(f"A connection can follow at most {WS_MAX_SUBSCRIPTIONS} debates")
+
+        source, frames = "none", []
+        if last_seq is not None:
+            source, frames = "buffer", self.replay.since(debate_id, last_seq)
+            if frames is None:
+                source = "database"
+                read_from_seq = self.replay.latest_seq(debate_id)
+                messages = await resync() if resync is not None else []
+                frames = [(None, encode_message({**message, "debate_id": debate_id})) for message in messages]
+                frames += self.replay.after(debate_id, read_from_seq)
+                if connection.closed:
+                    return
+
+        # No awaits from here until the connection is registered, so no live frame can slip in between
+        latest_seq = self.replay.latest_seq(debate_id)
+        replay_complete = encode_message({
+            "type": "replay_complete",
+            "debate_id": debate_id,
+            "data": {"seq": latest_seq, "source": source, "replayed": len(frames)}
+        })
+        connection.enqueue_replay(debate_id, frames, replay_complete, latest_seq)
+        connection.debates.add(debate_id)
+        self.active_connections.setdefault(debate_id, {})[connection.connection_id] = connection
+
+    def unsubscribe(self, connection: ClientConnection, debate_id: str):
+        connection.debates.discard(debate_id)
+        connections = self.active_connections.get(debate_id)
+        if connections is not None:
+            connections.pop(connection.connection_id, None)
+            if not connections:
+                self.active_connections.pop(debate_id, None)
+
+    def close_later(self, connection: ClientConnection):
+        """Close a connection from code that cannot await, e.g. while enqueueing a frame."""
+        task = asyncio.create_task(connection.close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def evict(self, connection: ClientConnection):
+        """Remove a closed connection from the index."""
+        for debate_id in list(connection.debates):
+            self.unsubscribe(connection, debate_id)
+        self.connections.pop(connection.connection_id, None)
+
+    def set_batch_window(self, debate_id: str, window_ms: Optional[float]):
+        """Override the batching window for one debate; None restores the default."""
+        if window_ms is None:
+            self._batch_windows.pop(debate_id, None)
+        else:
+            self._batch_windows[debate_id] = window_ms
+
+    async def broadcast_message(self, debate_id: str, message: dict, ephemeral: bool = False):
+        """Publish an event to every subscriber of the debate.
+
+        Ephemeral events (streamed reasoning chunks) get no sequence number,
+        are not batched and are not kept for replay: a client that misses
+        them gets the complete result from the event that follows.
+        """
+        if ephemeral:
+            await self.backend.publish(debate_id, None, encode_message({**message, "debate_id": debate_id}))
+            return
+        window_ms = self._batch_windows.get(debate_id, self.batch_window_ms)
+        if window_ms <= 0:
+            await self._publish(debate_id, message)
+            return
+        pending = self._pending_batches.setdefault(debate_id, [])
+        pending.append(message)
+        if len(pending) >= self.batch_max_events:
+            await self.flush(debate_id)
+        elif debate_id not in self._batch_flushers:
+            self._batch_flushers[debate_id] = asyncio.create_task(self._flush_after(debate_id, window_ms / 1000))
+
+    async def _flush_after(self, debate_id: str, delay: float):
+        await asyncio.sleep(delay)
+        self._batch_flushers.pop(debate_id, None)
+        try:
+            await self.flush(debate_id)
+        except Exception as e:
+            logger.error(f"Error flushing broadcast batch for debate {debate_id}: {str(e)}")
+
+    async def flush(self, debate_id: str):
+        """Publish the debate's pending batch now, as one frame."""
+        flusher = self._batch_flushers.pop(debate_id, None)
+        if flusher is not None:
+            flusher.cancel()
+        messages = self._pending_batches.pop(debate_id, None)
+        if not messages:
+            return
+        if len(messages) == 1:
+            await self._publish(debate_id, messages[0])
+        else:
+            await self._publish(debate_id, {"type": "batch", "data": messages})
+
+    async def _publish(self, debate_id: str, message: dict):
+        seq = await self.backend.next_seq(debate_id)
+        # Encode once; every worker sends the same frame to its subscribers
+        await self.backend.publish(debate_id, seq, encode_message({**message, "seq": seq, "debate_id": debate_id}))
+
+    async def deliver(self, debate_id: str, seq: Optional[int], frame: str):
+        """Hand a published frame to this worker's sockets for the debate."""
+        if seq is not None:
+            self.replay.record(debate_id, seq, frame)
+        for connection in list(self.active_connections.get(debate_id, {}).values()):
+            connection.enqueue(frame, seq)
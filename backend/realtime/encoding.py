@@ -0,0 +1,14 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # optional speedup, fall back to the stdlib encoder
+    orjson = None
+
+
+def encode_message(message: dict) -> str:
+    """Encode a broadcast payload to the JSON text frame sent to every subscriber."""
+    if orjson is not None:
+        # Juror responses are keyed by integer juror ids
+        return orjson.dumps(message, default=str, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(message, default=str, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,63 @@
+import os
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+
+# "delta": broadcast juror_delta events with only the jurors that changed; "full": the whole juror_response
+JUROR_BROADCAST_MODE = os.getenv("JUROR_BROADCAST_MODE", "delta")
+# Reasoning counts as changed when it is less similar than this to what clients last received (0..1)
+JUROR_REASONING_CHANGE_THRESHOLD = float(os.getenv("JUROR_REASONING_CHANGE_THRESHOLD", "0.2"))
+
+JUROR_BROADCAST_MODES = ("delta", "full")
+
+
+def reasoning_changed(old: str, new: str, threshold: float = JUROR_REASONING_CHANGE_THRESHOLD) -> bool:
+    if old == new:
+        return False
+    return 1 - SequenceMatcher(None, old or "", new or "").ratio() > threshold
+
+
+def tally(responses: Dict[int, dict], num_sides: int) -> List[int]:
+    """Votes per side index."""
+    counts = [0] * num_sides
+    for response in responses.values():
+        result = response.get("result")
+        if isinstance(result, int) and 0 <= result < num_sides:
+            counts[result] += 1
+    return counts
+
+
+class JurorDeltaTracker:
+    """Decides which juror results clients need to be sent again.
+
+    The baseline is what clients were last *sent* for each juror, not what
+    was last computed, so many small edits cannot add up to a large unseen
+    change. It is kept with each juror's state in the database
+    (juror_states.sent_result / sent_reasoning), so every worker compares
+    against the same baseline.
+    """
+
+    def __init__(self, threshold: float = JUROR_REASONING_CHANGE_THRESHOLD):
+        self.threshold = threshold
+
+    @staticmethod
+    def baseline(states) -> Dict[int, dict]:
+        """What clients were last sent, from juror_states rows keyed by juror_id."""
+        return {
+            juror_id: {"result": state.sent_result, "reasoning": state.sent_reasoning}
+            for juror_id, state in states.items() if state.sent_result is not None
+        }
+
+    def is_changed(self, previous: Optional[dict], response: dict) -> bool:
+        if previous is None or previous["result"] != response["result"]:
+            return True
+        return reasoning_changed(previous["reasoning"], response["reasoning"], self.threshold)
+
+    def diff(self, baseline: Dict[int, dict], responses: Dict[int, dict]) -> Dict[int, dict]:
+        """The jurors whose result or reasoning changed against the baseline."""
+        return {
+            juror_id: response for juror_id, response in responses.items()
+            if self.is_changed(baseline.get(juror_id), response)
+        }
+
+
+juror_deltas = JurorDeltaTracker()
@@ -0,0 +1,168 @@
+import os
+import asyncio
+import logging
+from contextlib import nullcontext
+from typing import AsyncContextManager, Awaitable, Callable, Dict, Optional
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # only needed for BROADCAST_BACKEND=redis
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+# "memory": single process; "redis": fan out across workers/replicas through Redis pub/sub
+BROADCAST_BACKEND = os.getenv("BROADCAST_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+BROADCAST_CHANNEL_PREFIX = os.getenv("BROADCAST_CHANNEL_PREFIX", "daocouncil:debate:")
+
+# Called with (debate_id, seq, frame) for every frame published to any debate; seq is None for ephemeral frames
+Deliver = Callable[[str, Optional[int], str], Awaitable[None]]
+
+
+class BroadcastBackend:
+    """Carries encoded frames from the publishing worker to every worker.
+
+    `start(deliver)` registers the callback that hands a frame to this
+    worker's local sockets; `publish` sends a frame to a debate's channel.
+    `next_seq` hands out the debate's event sequence numbers, shared by
+    all workers; ephemeral frames are published with seq None. `lock`
+    returns an async context manager held by at most one worker at a time.
+    """
+
+    async def start(self, deliver: Deliver):
+        raise NotImplementedError
+
+    async def next_seq(self, debate_id: str) -> int:
+        raise NotImplementedError
+
+    async def publish(self, debate_id: str, seq: Optional[int], frame: str):
+        raise NotImplementedError
+
+    def lock(self, name: str, timeout: float) -> AsyncContextManager:
+        raise NotImplementedError
+
+    async def stop(self):
+        pass
+
+
+class MemoryBroadcastBackend(BroadcastBackend):
+    """Delivers straight to this process's sockets. Only correct with a single worker."""
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+        self._seqs: Dict[str, int] = {}
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+
+    async def next_seq(self, debate_id: str) -> int:
+        seq = self._seqs[debate_id] = self._seqs.get(debate_id, 0) + 1
+        return seq
+
+    async def publish(self, debate_id: str, seq: Optional[int], frame: str):
+        if self._deliver is not None:
+            await self._deliver(debate_id, seq, frame)
+
+    def lock(self, name: str, timeout: float) -> AsyncContextManager:
+        # There are no other workers to exclude
+        return nullcontext()
+
+
+class RedisBroadcastBackend(BroadcastBackend):
+    """Publishes each frame to a per-debate Redis channel.
+
+    Every worker pattern-subscribes to all debate channels and delivers the
+    frames to whatever sockets it holds locally. Sequence numbers come from
+    a per-debate INCR counter and are sent as a "<seq>" line ahead of the
+    frame (an empty line for ephemeral frames). `client` can be any redis.asyncio-compatible client (e.g.
+    fakeredis in local runs).
+    """
+
+    def __init__(self, url: str = REDIS_URL, client=None, channel_prefix: str = BROADCAST_CHANNEL_PREFIX,
+                 reconnect_delay: float = 1.0, subscribe_timeout: float = 5.0):
+        if client is None:
+            if aioredis is None:
+                raise RuntimeError("BROADCAST_BACKEND=redis requires the 'redis' package")
+            client = aioredis.from_url(url)
+        self.client = client
+        self.channel_prefix = channel_prefix
+        self.reconnect_delay = reconnect_delay
+        self.subscribe_timeout = subscribe_timeout
+        self._deliver: Optional[Deliver] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribed = asyncio.Event()
+
+    def channel(self, debate_id: str) -> str:
+        return f"{self.channel_prefix}{debate_id}"
+
+    def seq_key(self, debate_id: str) -> str:
+        return f"{self.channel_prefix}seq:{debate_id}"
+
+    def lock_key(self, name: str) -> str:
+        return f"{self.channel_prefix}lock:{name}"
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+        self._listener = asyncio.create_task(self._listen())
+        # Frames published before the subscription is active would be missed
+        try:
+            await asyncio.wait_for(self._subscribed.wait(), self.subscribe_timeout)
+        except asyncio.TimeoutError:
+            logger.error("Redis broadcast subscription not ready yet; continuing to retry in the background")
+
+    async def next_seq(self, debate_id: str) -> int:
+        return int(await self.client.incr(self.seq_key(debate_id)))
+
+    async def publish(self, debate_id: str, seq: Optional[int], frame: str):
+        await self.client.publish(self.channel(debate_id), f"{'' if seq is None else seq}\n{frame}")
+
+    def lock(self, name: str, timeout: float) -> AsyncContextManager:
+        # Expires after `timeout` seconds so a worker that dies holding it does not block the others
+        return self.client.lock(self.lock_key(name), timeout=timeout)
+
+    async def _listen(self):
+        pattern = f"{self.channel_prefix}*"
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(pattern)
+                self._subscribed.set()
+                async for message in pubsub.listen():
+                    if message.get("type") != "pmessage":
+                        continue
+                    channel, data = message["channel"], message["data"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode("utf-8")
+                    if isinstance(data, bytes):
+                        data = data.decode("utf-8")
+                    try:
+                        seq, frame = data.split("\n", 1)
+                        await self._deliver(channel[len(self.channel_prefix):], int(seq) if seq else None, frame)
+                    except Exception as e:
+                        logger.error(f"Error delivering broadcast on {channel}: {str(e)}")
+            except asyncio.CancelledError:
+                await pubsub.aclose()
+                raise
+            except Exception as e:
+                logger.error(f"Redis broadcast subscription lost, retrying: {str(e)}")
+                await pubsub.aclose()
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await self.client.aclose()
+
+
+def create_broadcast_backend(name: str = BROADCAST_BACKEND) -> BroadcastBackend:
+    if name == "memory":
+        return MemoryBroadcastBackend()
+    if name == "redis":
+        return RedisBroadcastBackend()
+    raise ValueError(f"Unknown BROADCAST_BACKEND: {name}")
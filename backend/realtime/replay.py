@@ -0,0 +1,68 @@
+import os
+from collections import OrderedDict, deque
+from typing import List, Optional, Tuple
+
+# Recent frames kept per debate for clients that reconnect with ?last_seq=
+REPLAY_BUFFER_SIZE = int(os.getenv("REPLAY_BUFFER_SIZE", "512"))
+# Debates whose buffers are kept at once (least recently published is dropped first)
+REPLAY_MAX_DEBATES = int(os.getenv("REPLAY_MAX_DEBATES", "1000"))
+
+
+class _DebateBuffer:
+    def __init__(self, size: int):
+        self.frames: deque = deque(maxlen=size)  # (seq, frame)
+        self.latest_seq = 0
+
+
+class ReplayBuffer:
+    """Bounded ring of recently delivered frames per debate, keyed by sequence number."""
+
+    def __init__(self, size: int = REPLAY_BUFFER_SIZE, max_debates: int = REPLAY_MAX_DEBATES):
+        self.size = size
+        self.max_debates = max_debates
+        self._debates: "OrderedDict[str, _DebateBuffer]" = OrderedDict()
+
+    def record(self, debate_id: str, seq: int, frame: str):
+        buffer = self._debates.get(debate_id)
+        if buffer is None:
+            buffer = self._debates[debate_id] = _DebateBuffer(self.size)
+            while len(self._debates) > self.max_debates:
+                self._debates.popitem(last=False)
+        else:
+            self._debates.move_to_end(debate_id)
+        buffer.frames.append((seq, frame))
+        buffer.latest_seq = max(buffer.latest_seq, seq)
+
+    def latest_seq(self, debate_id: str) -> int:
+        buffer = self._debates.get(debate_id)
+        return buffer.latest_seq if buffer is not None else 0
+
+    def since(self, debate_id: str, last_seq: int) -> Optional[List[Tuple[int, str]]]:
+        """(seq, frame) for the frames with seq > last_seq, oldest first.
+
+        Returns None when some of them may no longer be in the buffer (it
+        wrapped, or this process has not seen the debate since last_seq),
+        in which case the caller has to fall back to the database.
+        """
+        buffer = self._debates.get(debate_id)
+        if buffer is None or not buffer.frames:
+            return [] if last_seq == 0 else None
+        if last_seq == buffer.latest_seq:
+            return []
+        if last_seq > buffer.latest_seq:
+            # Sequence numbers from before a restart
+            return None
+        oldest_seq = buffer.frames[0][0]
+        if oldest_seq > last_seq + 1:
+            return None
+        return self.after(debate_id, last_seq)
+
+    def after(self, debate_id: str, last_seq: int) -> List[Tuple[int, str]]:
+        """(seq, frame) for the buffered frames with seq > last_seq, without checking for gaps."""
+        buffer = self._debates.get(debate_id)
+        if buffer is None:
+            return []
+        return [(seq, frame) for seq, frame in buffer.frames if seq > last_seq]
+
+    def forget(self, debate_id: str):
+        self._debates.pop(debate_id, None)
@@ -562,6 +562,35 @@ const App = () => {
     console.log('Updated AI voting trends:', cumulativeVotes);
   }, [currentDebateInfo, handleJurorVote]);
 
+  // Show each juror's reasoning while it streams in; the juror_delta / juror_response ending the round replaces it
+  const handleJurorStream = useCallback(({ message_id, juror_id, result, reasoning }) => {
+    const sides = currentDebateInfo?.sides;
+    if (!sides) return;
+    const sideName = result >= 0 && result < sides.length ? sides[result] : "Undecided";
+    const key = `${juror_id}-${message_id}`;
+    setJurorOpinions(prev => ({
+      ...prev,
+      [key]: {
+        id: prev[key]?.id ?? `${Date.now()}-${juror_id}`,
+        jurorId: String(juror_id),
+        result: sideName,
+        stance: sideName,
+        reasoning: reasoning || '',
+        timestamp: prev[key]?.timestamp ?? new Date().toISOString(),
+        messageId: message_id
+      }
+    }));
+  }, [currentDebateInfo]);
+
+  // A superseded round never stores its results: remove the opinions it streamed
+  const handleJurorRoundCancelled = useCallback(({ first_message_id, last_message_id }) => {
+    setJurorOpinions(prev => Object.fromEntries(
+      Object.entries(prev).filter(([, opinion]) =>
+        !(opinion.messageId >= first_message_id && opinion.messageId <= last_message_id)
+      )
+    ));
+  }, []);
+
   // 设置 handleJurorVote 函数
   const setJurorVoteHandler = useCallback((handler) => {
     console.log('Setting juror vote handler');
@@ -590,12 +619,14 @@ const App = () => {
   }, [handleJudgeCommand]);
 
   // WebSocket 连接
-  const { connectWebSocket, disconnectWebSocket, isConnected } = useWebSocket(
+  const { connectWebSocket, disconnectWebSocket, postMessage, isConnected } = useWebSocket(
     currentDebateId,
     walletAddress || 'anonymous',
     handleNewMessage,
     handleJurorResponse,
-    handleJudgeMessage
+    handleJudgeMessage,
+    handleJurorStream,
+    handleJurorRoundCancelled
   );
 
   // WebSocket 重连和历史记录获取
@@ -669,7 +700,8 @@ const App = () => {
         messageData.stance,
         currentRound,
         null,
-        currentDebateInfo
+        currentDebateInfo,
+        postMessage
       );
     } catch (error) {
       console.error('Error sending message:', error);
@@ -5,7 +5,7 @@ export const useMessages = (walletAddress, username) => {
   const [messages, setMessages] = useState([]);
   const [isLoading, setIsLoading] = useState(false);
 
-  const addMessage = async (text, stance, round, replyTo = null, debateInfo = null) => {
+  const addMessage = async (text, stance, round, replyTo = null, debateInfo = null, postMessage = null) => {
     try {
       setIsLoading(true);
       if (!debateInfo) {
@@ -30,20 +30,35 @@ export const useMessages = (walletAddress, username) => {
       // 调试日志
       console.log('Sending message data:', messageData);
 
-      const response = await fetch(`${API_CONFIG.BACKEND_URL}/msg`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(messageData),
-      });
-
-      if (!response.ok) {
-        const errorData = await response.json();
-        throw new Error(errorData.detail || 'Failed to send message');
+      let responseData = null;
+      if (postMessage) {
+        try {
+          // Over the open debate socket; acked with the same { message_id, status } as POST /msg
+          responseData = await postMessage(messageData);
+        } catch (error) {
+          // Fall back to HTTP only if the frame never left; otherwise the server may already have stored it
+          if (!error.notSent) {
+            throw error;
+          }
+        }
       }
 
-      const responseData = await response.json();
+      if (!responseData) {
+        const response = await fetch(`${API_CONFIG.BACKEND_URL}/msg`, {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify(messageData),
+        });
+
+        if (!response.ok) {
+          const errorData = await response.json();
+          throw new Error(errorData.detail || 'Failed to send message');
+        }
+
+        responseData = await response.json();
+      }
       console.log('Server response:', responseData);  // 添加服务器响应日志
       console.log('Message sent successfully. Waiting for potential juror response...');  // 添加日志
 
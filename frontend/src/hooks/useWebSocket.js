@@ -1,8 +1,20 @@
 import { useEffect, useCallback, useRef } from 'react';
 import { API_CONFIG } from '../config/api';
 
-export const useWebSocket = (debateId, clientId, onNewMessage, onJurorResponse, onJudgeMessage) => {
+export const useWebSocket = (debateId, clientId, onNewMessage, onJurorResponse, onJudgeMessage, onJurorStream, onJurorRoundCancelled) => {
   const wsRef = useRef(null);
+  // Resume point sent on reconnect so the server only replays what we missed
+  const lastSeqRef = useRef(null);
+  const lastMessageIdRef = useRef(null);
+  // Full juror state that juror_delta events are merged into
+  const jurorStateRef = useRef({ message_id: null, responses: {} });
+  // Reasoning streamed so far per juror for the round in progress
+  const streamingRef = useRef({ message_id: null, reasoning: {} });
+  // Each juror's state before an uncommitted round's juror_response_done, by round message_id, to undo a cancelled round
+  const roundBaseRef = useRef(new Map());
+  // post_message frames waiting for their ack, by request_id
+  const pendingPostsRef = useRef(new Map());
+  const nextRequestIdRef = useRef(1);
 
   const connectWebSocket = useCallback(() => {
     if (wsRef.current?.readyState === WebSocket.OPEN) {
@@ -13,34 +25,64 @@ export const useWebSocket = (debateId, clientId, onNewMessage, onJurorResponse,
     // Convert http(s):// to ws(s)://
     const wsUrl = API_CONFIG.BACKEND_URL.replace(/^http/, 'ws').replace(/^https/, 'wss');
     console.log('Connecting to WebSocket URL:', wsUrl);
-    const ws = new WebSocket(`${wsUrl}/ws/${debateId}/${clientId}`);
+    const params = new URLSearchParams();
+    if (lastSeqRef.current !== null) {
+      params.set('last_seq', lastSeqRef.current);
+      if (lastMessageIdRef.current !== null) {
+        params.set('last_message_id', lastMessageIdRef.current);
+      }
+    }
+    const query = params.toString() ? `?${params.toString()}` : '';
+    const ws = new WebSocket(`${wsUrl}/ws/${debateId}/${clientId}${query}`);
 
     ws.onopen = () => {
       console.log('WebSocket connected successfully');
       // 连接成功后立即请求最新的 juror 响应
       if (onJurorResponse) {
-        fetch(`${API_CONFIG.BACKEND_URL}/juror_results/${debateId}`)
+        fetch(`${API_CONFIG.BACKEND_URL}/juror_results/${debateId}/latest`)
           .then(response => response.json())
           .then(data => {
             console.log('Fetched latest juror results:', data);
-            if (data && data.length > 0) {
-              const latestResponse = data[data.length - 1];
-              onJurorResponse({
-                message_id: latestResponse.message_id,
-                responses: latestResponse.responses
-              });
+            if (data && data.message_id !== null) {
+              jurorStateRef.current = { message_id: data.message_id, responses: data.responses };
+              onJurorResponse(jurorStateRef.current);
             }
           })
           .catch(error => console.error('Error fetching juror results:', error));
       }
     };
 
-    ws.onmessage = (event) => {
-      const data = JSON.parse(event.data);
-      console.log('WebSocket received message:', data);
-      
+    const handleEvent = (data) => {
       switch (data.type) {
+        case 'batch':
+          // Several events merged into one frame, in order
+          data.data.forEach(handleEvent);
+          break;
+        case 'ping':
+          // Answer the server heartbeat so the connection is not reaped as idle
+          ws.send(JSON.stringify({ type: 'pong', ts: data.data?.ts }));
+          break;
+        case 'ack':
+        case 'error': {
+          const pending = pendingPostsRef.current.get(data.data?.request_id);
+          if (pending) {
+            pendingPostsRef.current.delete(data.data.request_id);
+            if (data.type === 'ack') {
+              pending.resolve(data.data);
+            } else {
+              pending.reject(new Error(data.data.detail || 'Failed to send message'));
+            }
+          }
+          break;
+        }
+        case 'replay_complete':
+          // The server's sequence is authoritative (it may have restarted)
+          lastSeqRef.current = data.data.seq;
+          break;
         case 'new_message':
+          if (typeof data.data?.id === 'number') {
+            lastMessageIdRef.current = Math.max(lastMessageIdRef.current ?? 0, data.data.id);
+          }
           // Check if it's a judge agent message and has a valid ID
           if (data.data?.username === "Judge Agent" && data.data?.id) {
             console.log('Received judge message:', data.data);
@@ -52,13 +94,99 @@ export const useWebSocket = (debateId, clientId, onNewMessage, onJurorResponse,
           break;
         case 'juror_response':
           console.log('Received juror response for message:', data.data.message_id);
+          roundBaseRef.current.delete(data.data.message_id);
+          jurorStateRef.current = { message_id: data.data.message_id, responses: data.data.responses };
           onJurorResponse(data.data);
           break;
+        case 'juror_response_partial': {
+          const { message_id, juror_id, chunk } = data.data;
+          if (streamingRef.current.message_id !== message_id) {
+            streamingRef.current = { message_id, reasoning: {} };
+          }
+          const reasoning = (streamingRef.current.reasoning[juror_id] || '') + chunk;
+          streamingRef.current.reasoning[juror_id] = reasoning;
+          if (onJurorStream) {
+            // Until the juror is done, show the side it was on before this round
+            const previous = jurorStateRef.current.responses[juror_id];
+            onJurorStream({ message_id, juror_id, result: previous ? previous.result : -1, reasoning, done: false });
+          }
+          break;
+        }
+        case 'juror_response_done': {
+          // One juror finished; the juror_delta / juror_response closing the round still follows
+          const { message_id, juror_id, result } = data.data;
+          const previous = jurorStateRef.current.responses[juror_id];
+          if (!roundBaseRef.current.has(message_id)) {
+            roundBaseRef.current.set(message_id, {});
+          }
+          const roundBase = roundBaseRef.current.get(message_id);
+          if (!(juror_id in roundBase)) {
+            roundBase[juror_id] = previous;
+          }
+          // In delta mode an unchanged juror's reasoning is left out: we already hold it
+          const reasoning = data.data.unchanged ? previous?.reasoning : data.data.reasoning;
+          jurorStateRef.current = {
+            ...jurorStateRef.current,
+            responses: { ...jurorStateRef.current.responses, [juror_id]: { ...previous, result, reasoning } }
+          };
+          delete streamingRef.current.reasoning[juror_id];
+          if (onJurorStream) {
+            onJurorStream({ message_id, juror_id, result, reasoning, done: true });
+          }
+          break;
+        }
+        case 'juror_delta': {
+          // Only the jurors that changed; everyone else keeps what we already have
+          console.log('Received juror delta for message:', data.data.message_id);
+          roundBaseRef.current.delete(data.data.message_id);
+          jurorStateRef.current = {
+            message_id: data.data.message_id,
+            responses: { ...jurorStateRef.current.responses, ...data.data.changed }
+          };
+          onJurorResponse({ ...data.data, responses: jurorStateRef.current.responses });
+          break;
+        }
+        case 'juror_round_cancelled': {
+          // The round was superseded before its results were stored: undo what it streamed
+          const { first_message_id, last_message_id } = data.data;
+          const inRound = (messageId) => messageId >= first_message_id && messageId <= last_message_id;
+          const responses = { ...jurorStateRef.current.responses };
+          roundBaseRef.current.forEach((roundBase, messageId) => {
+            if (!inRound(messageId)) return;
+            Object.entries(roundBase).forEach(([jurorId, previous]) => {
+              if (previous === undefined) {
+                delete responses[jurorId];
+              } else {
+                responses[jurorId] = previous;
+              }
+            });
+            roundBaseRef.current.delete(messageId);
+          });
+          jurorStateRef.current = { ...jurorStateRef.current, responses };
+          if (inRound(streamingRef.current.message_id)) {
+            streamingRef.current = { message_id: null, reasoning: {} };
+          }
+          if (onJurorRoundCancelled) {
+            onJurorRoundCancelled({ first_message_id, last_message_id });
+          }
+          break;
+        }
         default:
           console.log('Unknown message type:', data.type);
       }
     };
 
+    ws.onmessage = (event) => {
+      const data = JSON.parse(event.data);
+      if (data.type !== 'juror_response_partial') {
+        console.log('WebSocket received message:', data);
+      }
+      if (typeof data.seq === 'number') {
+        lastSeqRef.current = Math.max(lastSeqRef.current ?? 0, data.seq);
+      }
+      handleEvent(data);
+    };
+
     ws.onerror = (error) => {
       console.error('WebSocket error:', error);
     };
@@ -66,12 +194,15 @@ export const useWebSocket = (debateId, clientId, onNewMessage, onJurorResponse,
     ws.onclose = () => {
       console.log('WebSocket disconnected');
       wsRef.current = null;
+      // Posts on this socket will never be acked; let callers retry over HTTP
+      pendingPostsRef.current.forEach(pending => pending.reject(new Error('WebSocket disconnected')));
+      pendingPostsRef.current.clear();
       // Try to reconnect after a delay
       setTimeout(connectWebSocket, 3000);
     };
 
     wsRef.current = ws;
-  }, [debateId, clientId, onNewMessage, onJurorResponse, onJudgeMessage]);
+  }, [debateId, clientId, onNewMessage, onJurorResponse, onJudgeMessage, onJurorStream, onJurorRoundCancelled]);
 
   const disconnectWebSocket = useCallback(() => {
     if (wsRef.current) {
@@ -80,6 +211,24 @@ export const useWebSocket = (debateId, clientId, onNewMessage, onJurorResponse,
     }
   }, []);
 
+  // Post a chat message over the open socket; resolves with { message_id } once the server acks it
+  const postMessage = useCallback(({ user_address, username, message, stance }) => {
+    const ws = wsRef.current;
+    if (ws?.readyState !== WebSocket.OPEN) {
+      // Nothing was sent, so the caller can safely post over HTTP instead
+      return Promise.reject(Object.assign(new Error('WebSocket is not connected'), { notSent: true }));
+    }
+    const requestId = nextRequestIdRef.current++;
+    return new Promise((resolve, reject) => {
+      pendingPostsRef.current.set(requestId, { resolve, reject });
+      ws.send(JSON.stringify({
+        type: 'post_message',
+        request_id: requestId,
+        data: { user_address, username, message, stance }
+      }));
+    });
+  }, []);
+
   useEffect(() => {
     if (!debateId || !clientId) return;
     connectWebSocket();
@@ -91,6 +240,7 @@ export const useWebSocket = (debateId, clientId, onNewMessage, onJurorResponse,
   return {
     connectWebSocket,
     disconnectWebSocket,
+    postMessage,
     isConnected: wsRef.current?.readyState === WebSocket.OPEN
   };
 };
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""Redis broadcast fan-out between workers, run against fakeredis instead of a Redis server."""
+import json
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from backend.realtime.connection_manager import ConnectionManager
+from backend.realtime.pubsub import RedisBroadcastBackend
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.frames = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, frame: str):
+        self.frames.append(json.loads(frame))
+
+    async def close(self):
+        pass
+
+    def events(self, event_type: str):
+        return [frame for frame in self.frames if frame["type"] == event_type]
+
+
+def make_worker(server) -> ConnectionManager:
+    """A worker's manager; workers built on the same FakeServer share one Redis."""
+    backend = RedisBroadcastBackend(client=fakeredis.aioredis.FakeRedis(server=server))
+    return ConnectionManager(backend=backend, heartbeat_interval=0, batch_window_ms=0)
+
+
+async def wait_until(predicate, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("timed out waiting for a broadcast")
+        await asyncio.sleep(0.01)
+
+
+async def run_workers(scenario):
+    server = fakeredis.FakeServer()
+    workers = [make_worker(server), make_worker(server)]
+    for worker in workers:
+        await worker.start()
+    try:
+        await scenario(*workers)
+    finally:
+        for worker in workers:
+            await worker.stop()
+
+
+def test_broadcast_reaches_other_worker_on_same_debate_only():
+    async def scenario(publisher, subscriber):
+        same_debate, other_debate = FakeWebSocket(), FakeWebSocket()
+        await subscriber.connect(same_debate, "1", "viewer")
+        await subscriber.connect(other_debate, "2", "viewer")
+
+        await publisher.broadcast_message("1", {"type": "new_message", "data": {"id": 7}})
+        await wait_until(lambda: same_debate.events("new_message"))
+        # Anything for debate 2 would have been delivered by now too
+        await asyncio.sleep(0.05)
+
+        [frame] = same_debate.events("new_message")
+        assert frame["data"] == {"id": 7}
+        assert frame["debate_id"] == "1"
+        assert frame["seq"] == 1
+        assert other_debate.events("new_message") == []
+
+    asyncio.run(run_workers(scenario))
+
+
+def test_ephemeral_frames_carry_no_seq():
+    async def scenario(publisher, subscriber):
+        websocket = FakeWebSocket()
+        await subscriber.connect(websocket, "1", "viewer")
+
+        await publisher.broadcast_message("1", {"type": "juror_response_partial", "data": {"chunk": "a"}}, ephemeral=True)
+        await publisher.broadcast_message("1", {"type": "juror_response_done", "data": {"juror_id": 1}})
+        await wait_until(lambda: websocket.events("juror_response_done"))
+
+        [partial] = websocket.events("juror_response_partial")
+        [done] = websocket.events("juror_response_done")
+        assert "seq" not in partial
+        assert done["seq"] == 1
+        # Only the sequenced frame is kept for replay
+        assert subscriber.replay.latest_seq("1") == 1
+
+    asyncio.run(run_workers(scenario))